@@ -1,8 +1,18 @@
+import io
+
 import streamlit as st
-import pandas as pd
-from datetime import datetime
-import re
-from io import StringIO
+
+from worktools.fiber_sheath import parse_fiber_sheaths_parallel
+from worktools.footage_reconcile import reconcile_footage_inputs
+from worktools.incremental import IncrementalSheathParser, IncrementalWaveParser, worth_reusing
+from worktools.instrumentation import stage
+from worktools.reconcile import issue_rows, reconcile_circuits
+from worktools.route_diff import DIFF_COLUMNS, DIFFS
+from worktools.wave_routes import build_full_coverage_path, build_wave_path, parse_wave_routes
+from worktools.streamlit_jobs import rerun_after_submit, show_job_panel, start_job
+from worktools.streamlit_perf import show_perf_panel, timed_run
+from worktools.xlr import parse_xlr, parse_xlr_record
+from worktools.xlsx_export import kmz_sheet, sheath_sheet, wave_path_sheet, write_workbook, xlr_sheet
 
 # Set page config
 st.set_page_config(
@@ -17,34 +27,25 @@ if 'spaces' not in st.session_state:
         'Data Processing': {
             'type': 'tool',
             'description': 'Tools for processing different types of data',
-            'tools': ['Wave Route Parser', 'Fiber Sheath Parser', 'XLR Parser']
+            'tools': ['Wave Route Parser', 'Fiber Sheath Parser', 'XLR Parser', 'Circuit Reconciliation', 'Sheath vs KMZ Footage', 'Compare Exports']
         }
     }
 
-def extract_field(data, field_names):
-    """
-    Try to extract the value for any of the field_names from the data.
-    Returns the value or None if not found.
-    """
-    for field in field_names:
-        # Regex: field name, optional spaces, then value (until end of line)
-        match = re.search(rf"{field}\s*[:=]?\s*(.+)", data, re.IGNORECASE)
-        if match:
-            value = match.group(1).strip()
-            # If the value is just a dash or empty, skip
-            if value and value != "-":
-                return value
-    return None
-
 def main():
+    with timed_run("full script"):
+        render_app()
+
+def render_app():
     # Sidebar for navigation
     st.sidebar.title("My Spaces")
 
     # Tool selection using radio buttons
     selected_tool = st.sidebar.radio(
         "Select Tool",
-        options=st.session_state.spaces['Data Processing']['tools']
+        options=st.session_state.spaces['Data Processing']['tools'],
+        key="selected_tool"
     )
+    show_perf_panel()
 
     # Main content area
     st.title("Data Processing")
@@ -57,6 +58,103 @@ def main():
         fiber_sheath_parser()
     elif selected_tool == "XLR Parser":
         show_xlr_parser()
+    elif selected_tool == "Circuit Reconciliation":
+        show_reconciliation()
+    elif selected_tool == "Sheath vs KMZ Footage":
+        show_footage_reconciliation()
+    elif selected_tool == "Compare Exports":
+        show_export_diff()
+
+    # After the tool, so results its jobs just finished are included
+    show_excel_export()
+
+HISTORY_KEYS = ["wave_history", "fiber_history", "xlr_history", "kmz_results",
+                "reconcile_history", "footage_history", "diff_history"]
+
+def history_sheet_count():
+    # One sheet per history entry, counted without building any rows
+    return sum(len(st.session_state.get(key, ())) for key in HISTORY_KEYS)
+
+def history_sheets():
+    """One workbook sheet per result in this session's history, oldest first within each tool."""
+    state = st.session_state
+    sheets = []
+    for idx, entry in enumerate(state.get("wave_history", [])):
+        sheets.append(wave_path_sheet(entry[3], f"Wave Path {idx+1}"))
+    for idx, (_, result) in enumerate(state.get("fiber_history", [])):
+        sheets.append(sheath_sheet(result, f"Sheath Footage {idx+1}"))
+    for idx, (input_text, _) in enumerate(state.get("xlr_history", [])):
+        # The history keeps the formatted text, so read the fields again from the input
+        sheets.append(xlr_sheet(parse_xlr_record(input_text), f"XLR Key Fields {idx+1}"))
+    for idx, (rows, _) in enumerate(state.get("kmz_results", {}).values()):
+        sheets.append(kmz_sheet(rows, f"KMZ Comparison {idx+1}"))
+    for idx, result in enumerate(state.get("reconcile_history", [])):
+        sheets.append((f"Reconciliation {idx+1}", ['Circuit', 'Issue', 'XLR facility', 'Wave route'], issue_rows(result)))
+    for idx, (_, result) in enumerate(state.get("footage_history", [])):
+        sheets.append((f"Footage Reconciliation {idx+1}",
+                       ['sheath', 'placemark', 'match', 'sheath_ft', 'kmz_ft', 'delta_ft'], result['sheaths']))
+    for idx, (_, kind, result) in enumerate(state.get("diff_history", [])):
+        sheets.append((f"Comparison {idx+1}", DIFF_COLUMNS[kind], result['rows']))
+    return sheets
+
+def show_excel_export():
+    st.sidebar.subheader("Excel Export")
+    # This runs on every rerun, so the sheets are only read when a workbook is built
+    count = history_sheet_count()
+    if not count:
+        st.sidebar.caption("Results from every tool can be exported here as one workbook.")
+        return
+    if st.sidebar.button(f"Build workbook ({count} sheets)", key="xlsx_build"):
+        buffer = io.BytesIO()
+        try:
+            with stage("export.xlsx"):
+                write_workbook(buffer, history_sheets())
+        except ImportError:
+            st.sidebar.error("Excel export needs the xlsxwriter package.")
+            return
+        st.session_state['xlsx_export'] = (count, buffer.getvalue())
+    # Histories only grow, so a workbook with fewer sheets is out of date
+    built = st.session_state.get('xlsx_export')
+    if built and built[0] == count:
+        st.sidebar.download_button(
+            "Download workbook",
+            data=built[1],
+            file_name="work_tools_results.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+def show_table(columns, key, column_config=None):
+    """Render a dict of equal-length columns as a single virtualized dataframe."""
+    rows = len(next(iter(columns.values()), []))
+    st.dataframe(
+        columns,
+        key=key,
+        hide_index=True,
+        use_container_width=True,
+        column_config=column_config,
+        # Grow with the data up to a scrollable viewport of about 15 rows
+        height=min(38 + 35 * rows, 560)
+    )
+
+def session_parser(key, factory):
+    """This session's incremental parser; it keeps the previous paste's results between parses."""
+    if key not in st.session_state:
+        st.session_state[key] = factory()
+    return st.session_state[key]
+
+def route_columns(routes):
+    """Split Facility records into Seq and Facility columns."""
+    seqs, facilities = [], []
+    for route in routes:
+        seqs.append(route.number)
+        facilities.append(route.facility)
+    return {"Seq": seqs, "Facility": facilities}
+
+def render_xlr_result(idx, input_text, output_text):
+    st.subheader(f"XLR Parse #{idx+1}")
+    st.text_area(f"Input #{idx+1}", input_text, height=150, key=f"xlr_input_{idx}", disabled=True)
+    st.code(output_text, language="text")
+    st.divider()
 
 def show_xlr_parser():
     st.header("XLR Parser")
@@ -66,267 +164,58 @@ def show_xlr_parser():
         st.session_state.xlr_history = []
 
     # Show all previous parses
-    for idx, (input_text, output_text) in enumerate(st.session_state.xlr_history):
-        st.subheader(f"XLR Parse #{idx+1}")
-        st.text_area(f"Input #{idx+1}", input_text, height=150, key=f"xlr_input_{idx}", disabled=True)
-        st.code(output_text, language="text")
-        st.divider()
-
-    # New input box at the bottom
-    with st.form(key=f"xlr_form_{len(st.session_state.xlr_history)}"):
-        xlr_text = st.text_area("Paste XLR text here:", height=300, key=f"xlr_input_new_{len(st.session_state.xlr_history)}")
-        submitted = st.form_submit_button("Parse XLR")
-        if submitted and xlr_text.strip():
-            fields_to_extract = [
-                "Service Name", "Circuit ID", "Account Name",
-                "Product Group", "Product", "Product Category", "Rate Code",
-                "A-Clli", "A-Address", "Z-Clli", "Z-Address"
-            ]
-            extracted = {field: "Not found" for field in fields_to_extract}
-            for line in xlr_text.splitlines():
-                for field in fields_to_extract:
-                    if line.startswith(field + "\t"):
-                        parts = line.split('\t', 1)
-                        if len(parts) > 1:
-                            extracted[field] = parts[1].strip()
-            a_clli = extracted.get("A-Clli", "").strip()
-            z_clli = extracted.get("Z-Clli", "").strip()
-
-            # Find the table header and parse the table
-            lines = xlr_text.splitlines()
-            table_start = None
-            for i, line in enumerate(lines):
-                if (
-                    "CLLI" in line and "Address" in line
-                    and line.count('\t') > 2
-                ):
-                    table_start = i
-                    break
-
-            clli_to_address = {}
-            if table_start is not None:
-                table_text = "\n".join(lines[table_start:])
-                try:
-                    df = pd.read_csv(
-                        StringIO(table_text),
-                        sep='\t',
-                        dtype=str,
-                        on_bad_lines='skip',
-                        skip_blank_lines=True
-                    )
-                    df.columns = df.columns.str.strip()
-                    if "CLLI" in df.columns and "Address" in df.columns:
-                        for clli, addr in zip(df["CLLI"], df["Address"]):
-                            if pd.notna(clli) and pd.notna(addr) and addr.strip():
-                                clli_to_address[clli.strip()] = addr.strip()
-                except Exception as e:
-                    pass
-
-            def fuzzy_lookup_first(base_clli):
-                for clli, addr in clli_to_address.items():
-                    if clli.startswith(base_clli):
-                        return addr
-                return "Not found"
-
-            address_a = fuzzy_lookup_first(a_clli) if a_clli else "Not found"
-            address_z = fuzzy_lookup_first(z_clli) if z_clli else "Not found"
-
-            # Network Facilities Extraction
-            facilities = []
-            facility_pattern = re.compile(
-                r'([A-Z0-9]+)?\s*/([0-9A-Z]+(?:G|FIBER))\s*/([A-Z0-9]+)/([A-Z0-9]+)', re.IGNORECASE)
-            for line in xlr_text.splitlines():
-                m = facility_pattern.search(line)
-                if m:
-                    facilities.append(f"{m.group(1) or ''} /{m.group(2)} /{m.group(3)}/{m.group(4)}".strip())
-
-            # Output
-            output = []
-            output.append("=== Key Fields ===")
-            output.append(f"Service Name: {extracted['Service Name']}")
-            output.append(f"Circuit ID: {extracted['Circuit ID']}")
-            output.append(f"Account Name: {extracted['Account Name']}")
-            product_summary = f"{extracted['Rate Code']} {extracted['Product']}".replace("Standard Wavelength", "Wavelength").strip()
-            output.append(f"Product: {product_summary}")
-            output.append(f"A-Clli: {extracted['A-Clli']}")
-            output.append(f"A-Address: {extracted['A-Address']}")
-            output.append(f"Z-Clli: {extracted['Z-Clli']}")
-            output.append(f"Z-Address: {extracted['Z-Address']}")
-            output.append("")
-            output.append(f"Street Address for A-Clli ({a_clli}): {address_a}")
-            output.append(f"Street Address for Z-Clli ({z_clli}): {address_z}")
-            output.append("")
-            if facilities:
-                output.append("=== Network Facilities ===")
-                output.extend(facilities)
-
-            result = "\n".join(output)
-            # Save this input/output pair to session state
-            st.session_state.xlr_history.append((xlr_text, result))
-            st.rerun()
-
-def parse_facility_id(line):
-    """Parse a network facility ID into its components."""
-    match = re.search(r'(\d+)\s+(/FIBER\w+/[A-Z0-9]+/[A-Z0-9]+)', line)
-    if not match:
-        return None
-
-    seq_num, facility = match.groups()
-    parts = facility.split('/')
-    if len(parts) != 4:
-        return None
-
-    _, fiber_type, loc1, loc2 = parts
-    loc1_code = loc1[:8]
-    loc1_suffix = loc1[8:]
-    loc2_code = loc2[:8]
-    loc2_suffix = loc2[8:]
-
-    return {
-        'seq_num': seq_num,
-        'full_facility': facility,
-        'fiber_type': fiber_type,
-        'loc1': {
-            'code': loc1_code,
-            'suffix': loc1_suffix,
-            'full': loc1
-        },
-        'loc2': {
-            'code': loc2_code,
-            'suffix': loc2_suffix,
-            'full': loc2
-        }
-    }
-
-def detect_system_change(prev_segment, curr_segment):
-    if not prev_segment or not curr_segment:
-        return False
-    for loc in ['loc1', 'loc2']:
-        prev_loc = prev_segment[loc]
-        curr_loc = curr_segment[loc]
-        if prev_loc['code'] == curr_loc['code'] and prev_loc['suffix'] != curr_loc['suffix']:
-            return True
-    return False
-
-def remove_duplicates(routes):
-    seen = set()
-    unique_routes = []
-    for route in routes:
-        route_key = f"{route['seq_num']} {route['full_facility']}"
-        if route_key not in seen:
-            seen.add(route_key)
-            unique_routes.append(route)
-    return unique_routes
-
-def parse_wave_routes(input_data):
-    filtered_lines = []
-    for line in input_data.splitlines():
-        parts = line.split()
-        if len(parts) > 2:
-            facility_parts = [p for p in parts if p.startswith('/')]
-            if not facility_parts:
-                continue
-            facility = facility_parts[0]
-            if '/FIBER' in facility.upper() and not line.endswith('null null'):
-                try:
-                    number = parts[1]
-                    path_parts = facility.split('/')
-                    if len(path_parts) == 4:
-                        _, fiber_type, loc1, loc2 = path_parts
-                        filtered_lines.append(f"{number} {facility}")
-                except:
-                    continue
-    unique_lines = []
-    seen = set()
-    for line in filtered_lines:
-        if line not in seen:
-            unique_lines.append(line)
-            seen.add(line)
-    return unique_lines
-
-def build_wave_path(output1, start_loc):
-    def get_clli(loc):
-        return loc[:8] if len(loc) >= 8 else loc
-
-    def get_suffix_type(loc):
-        if len(loc) > 8:
-            return loc[8:9]
-        return ''
-
-    routes = []
-    original_unique_routes = set(output1)
-    for line in output1:
-        parts = line.split()
-        if len(parts) < 2:
-            continue
-        number = parts[0]
-        facility = parts[1]
-        path_parts = facility.split('/')
-        if len(path_parts) != 4:
-            continue
-        _, fiber_type, loc1, loc2 = path_parts
-        routes.append({
-            'number': number,
-            'fiber_type': fiber_type,
-            'loc1': loc1,
-            'loc2': loc2,
-            'line': line,
-            'loc1_clli': get_clli(loc1),
-            'loc2_clli': get_clli(loc2)
-        })
-        routes.append({
-            'number': number,
-            'fiber_type': fiber_type,
-            'loc1': loc2,
-            'loc2': loc1,
-            'line': line,
-            'loc1_clli': get_clli(loc2),
-            'loc2_clli': get_clli(loc1)
-        })
-
-    used_lines = set()
-    final_routes = []
-    system_changes = 0
-    original_routes_count = len(original_unique_routes)
-
-    start_loc = get_clli(start_loc.strip().upper())
-    current_loc = None
-    prev_suffix = None
-
-    for route in routes:
-        if route['loc1_clli'] == start_loc:
-            final_routes.append(route['line'])
-            used_lines.add(route['line'])
-            current_loc = route['loc2_clli']
-            prev_suffix = get_suffix_type(route['loc1'])
-            break
-
-    if not final_routes:
-        return ["Error: Could not find starting location in parsed routes."], [], f"Original Routes: {original_routes_count} | Final Routes: 0 | System Changes: 0"
-
-    while True:
-        found = False
-        for route in routes:
-            if route['line'] in used_lines:
-                continue
-            if route['loc1_clli'] == current_loc:
-                curr_suffix = get_suffix_type(route['loc1'])
-                if prev_suffix and curr_suffix and prev_suffix != curr_suffix:
-                    final_routes.append('--- SYSTEM CHANGE ---')
-                    system_changes += 1
-                final_routes.append(route['line'])
-                used_lines.add(route['line'])
-                current_loc = route['loc2_clli']
-                prev_suffix = get_suffix_type(route['loc2'])
-                found = True
-                break
-        if not found:
-            break
-
-    final_routes_count = len([line for line in final_routes if not line.startswith('---')])
-    summary = f"Original Routes: {original_routes_count} | Final Routes: {final_routes_count} | System Changes: {system_changes}"
-    output3 = [line for line in output1]
-    return final_routes, output3, summary
+    with stage("render.history"):
+        for idx, (input_text, output_text) in enumerate(st.session_state.xlr_history):
+            render_xlr_result(idx, input_text, output_text)
+    st.session_state.xlr_rendered = len(st.session_state.xlr_history)
+
+    show_job_panel("XLR Parser", finish_xlr_job, render_new_xlr_results)
+    xlr_parser_fragment()
+
+def finish_xlr_job(job, result):
+    # Save this input/output pair to session state
+    st.session_state.xlr_history.append((job['context']['input'], result))
+
+def render_new_xlr_results():
+    # Parses finished since the last full run are only rendered by the job panel
+    history = st.session_state.xlr_history
+    for idx in range(st.session_state.xlr_rendered, len(history)):
+        render_xlr_result(idx, *history[idx])
+
+@st.fragment
+def xlr_parser_fragment():
+    with timed_run("XLR Parser"):
+        history = st.session_state.xlr_history
+
+        # New input box at the bottom
+        with st.form(key=f"xlr_form_{len(history)}", clear_on_submit=True):
+            xlr_text = st.text_area("Paste XLR text here:", height=300, key=f"xlr_input_new_{len(history)}")
+            submitted = st.form_submit_button("Parse XLR")
+            if submitted and xlr_text.strip():
+                # Parse in the background so another XLR can be submitted meanwhile
+                start_job("XLR Parser", "xlr", "Parsing XLR", parse_xlr, xlr_text,
+                          context={'input': xlr_text})
+                rerun_after_submit("XLR Parser")
+
+def render_wave_result(idx, input_text, parsed_routes, start_loc, path_result, summary, unconnected=()):
+    st.subheader(f"Wave Parse #{idx+1}")
+    st.text_area(f"Input #{idx+1}", input_text, height=150, key=f"wave_input_{idx}", disabled=True)
+
+    if parsed_routes:
+        st.markdown("#### Parsed Routes (Duplicates Removed)")
+        show_table(route_columns(parsed_routes), key=f"wave_parsed_{idx}")
+
+        if start_loc and path_result:
+            st.markdown(f"#### Starting Location: {start_loc}")
+            st.markdown("#### Continuous Path with System Changes")
+            path_text = "\n".join(path_result)
+            st.text_area(f"Path #{idx+1}", path_text, height=300, key=f"wave_path_{idx}", disabled=True)
+            if unconnected:
+                st.markdown("#### Routes Not Connected to the Starting Location")
+                show_table(route_columns(unconnected), key=f"wave_unconnected_{idx}")
+            st.markdown("#### Summary")
+            st.text(summary)
+    st.divider()
 
 def show_wave_route_parser():
     st.subheader("Wave Route Parser")
@@ -348,67 +237,139 @@ def show_wave_route_parser():
     st.markdown(description)
 
     # Show all previous parses
-    for idx, (input_text, parsed_routes, start_loc, path_result, summary) in enumerate(st.session_state.wave_history):
-        st.subheader(f"Wave Parse #{idx+1}")
-        st.text_area(f"Input #{idx+1}", input_text, height=150, key=f"wave_input_{idx}", disabled=True)
-        
-        if parsed_routes:
+    with stage("render.history"):
+        for idx, entry in enumerate(st.session_state.wave_history):
+            render_wave_result(idx, *entry)
+    st.session_state.wave_rendered = len(st.session_state.wave_history)
+
+    show_job_panel("Wave Route Parser", finish_wave_job, render_new_wave_results)
+    wave_route_fragment()
+
+def finish_wave_job(job, result):
+    if job['kind'] == 'wave_parse':
+        if result:
+            # Store the parsed routes temporarily
+            st.session_state['temp_wave_data'] = {
+                'input': job['context']['input'],
+                'routes': result
+            }
+        else:
+            st.session_state['wave_parse_error'] = "No valid routes found in input data"
+        # The start location form lives in the tool fragment, so rerun the page
+        return True
+
+    path, extra, summary = result
+    temp_data = job['context']
+    # Full coverage mode also returns the routes it could not reach
+    unconnected = extra if temp_data.get('full_coverage') else []
+    # Save to history
+    st.session_state.wave_history.append((
+        temp_data['input'],
+        temp_data['routes'],
+        temp_data['start_loc'],
+        path,
+        summary,
+        unconnected
+    ))
+    return False
+
+def render_new_wave_results():
+    # Paths finished since the last full run are only rendered by the job panel
+    history = st.session_state.wave_history
+    for idx in range(st.session_state.wave_rendered, len(history)):
+        render_wave_result(idx, *history[idx])
+
+@st.fragment
+def wave_route_fragment():
+    with timed_run("Wave Route Parser"):
+        history = st.session_state.wave_history
+
+        # New input section
+        st.markdown("Paste your route data below. After parsing, you'll be prompted for a starting location to build the continuous path.")
+
+        with st.form(key=f"wave_form_{len(history)}", clear_on_submit=True):
+            input_data = st.text_area("Paste your route data here", height=300, key=f"wave_input_new_{len(history)}")
+            incremental = st.checkbox("Incremental re-parse (reuse unchanged lines)", value=True,
+                                      key=f"wave_incremental_{len(history)}")
+            parse_submitted = st.form_submit_button("Parse")
+            if parse_submitted and input_data.strip():
+                st.session_state.pop('wave_parse_error', None)
+                parser = session_parser('wave_incremental_parser', IncrementalWaveParser)
+                # Large pastes that are mostly new parse faster on the process pool
+                if incremental and worth_reusing(parser, input_data):
+                    start_job("Wave Route Parser", "wave_parse", "Parsing wave routes", parser.parse,
+                              input_data, context={'input': input_data}, local=True)
+                else:
+                    start_job("Wave Route Parser", "wave_parse", "Parsing wave routes", parse_wave_routes,
+                              input_data, context={'input': input_data})
+                rerun_after_submit("Wave Route Parser")
+            if 'wave_parse_error' in st.session_state:
+                st.error(st.session_state['wave_parse_error'])
+
+        # If we have temporary parsed data, show it and ask for starting location
+        if 'temp_wave_data' in st.session_state:
+            temp_data = st.session_state['temp_wave_data']
             st.markdown("#### Parsed Routes (Duplicates Removed)")
-            routes_text = "\n".join(parsed_routes)
-            st.text_area(f"Parsed Routes #{idx+1}", routes_text, height=200, key=f"wave_parsed_{idx}", disabled=True)
-            
-            if start_loc and path_result:
-                st.markdown(f"#### Starting Location: {start_loc}")
-                st.markdown("#### Continuous Path with System Changes")
-                path_text = "\n".join(path_result)
-                st.text_area(f"Path #{idx+1}", path_text, height=300, key=f"wave_path_{idx}", disabled=True)
-                st.markdown("#### Summary")
-                st.text(summary)
-        st.divider()
-
-    # New input section
-    st.markdown("Paste your route data below. After parsing, you'll be prompted for a starting location to build the continuous path.")
-    
-    with st.form(key=f"wave_form_{len(st.session_state.wave_history)}"):
-        input_data = st.text_area("Paste your route data here", height=300, key=f"wave_input_new_{len(st.session_state.wave_history)}")
-        parse_submitted = st.form_submit_button("Parse")
-        if parse_submitted and input_data.strip():
-            routes = parse_wave_routes(input_data)
-            if routes:
-                # Store the parsed routes temporarily
-                st.session_state['temp_wave_data'] = {
-                    'input': input_data,
-                    'routes': routes
-                }
-                st.rerun()
-            else:
-                st.error("No valid routes found in input data")
+            show_table(route_columns(temp_data['routes']), key="wave_parsed_new")
+
+            with st.form(key=f"wave_start_form_{len(history)}"):
+                start_loc = st.text_input("Enter starting location code (8 characters)", key=f"wave_start_new_{len(history)}")
+                full_coverage = st.checkbox(
+                    "Cover every route (may add GAP markers where the path must jump)",
+                    key=f"wave_full_coverage_{len(history)}",
+                    help="The default path takes the first matching route at each location and can strand "
+                         "routes at branch points. This mode walks every route connected to the start.",
+                )
+                start_submitted = st.form_submit_button("Build Path")
+                if start_submitted and start_loc:
+                    build_path = build_full_coverage_path if full_coverage else build_wave_path
+                    start_job("Wave Route Parser", "wave_path", f"Building path from {start_loc}",
+                              build_path, temp_data['routes'], start_loc,
+                              context=dict(temp_data, start_loc=start_loc, full_coverage=full_coverage))
+
+                    # Clear temporary data
+                    del st.session_state['temp_wave_data']
+                    rerun_after_submit("Wave Route Parser")
+
+def render_fiber_result(idx, input_text, result_data):
+    st.subheader(f"Fiber Parse #{idx+1}")
+    st.text_area(f"Input #{idx+1}", input_text, height=150, key=f"fiber_input_{idx}", disabled=True)
+
+    # Display the results
+    st.subheader("Total Route Distance")
+    st.markdown(f"<p style='color:blue'>Total Footage: <b>{result_data['total_footage']:.2f} FT</b></p>", unsafe_allow_html=True)
+    st.markdown(f"<p style='color:green'>Total Miles: <b>{result_data['total_miles']:.2f} miles</b></p>", unsafe_allow_html=True)
+    st.markdown(f"<p style='color:purple'>Total Kilometers: <b>{result_data['total_km']:.2f} km</b></p>", unsafe_allow_html=True)
+    st.markdown(f"Estimated optical distance: <b>{result_data['estimated_optical_km']:.2f} km</b> <span style='color:red'>(13% added for slack, splices, and slack loops)</span>", unsafe_allow_html=True)
+
+    # One virtualized table per section; sorting and filtering happen in the browser
+    st.subheader("EXPANDED Fiber route as described by Cable Names")
+    if result_data['cable_names']:
+        show_table({"Cable": result_data['cable_names']}, key=f"fiber_cables_{idx}")
+    else:
+        st.write("No cable names found.")
+
+    st.subheader("Detailed Cable Path with Individual Segments")
+    if result_data['unique_sheaths']:
+        show_table({
+            "Sheath": list(result_data['sheath_footage'].keys()),
+            "Footage (FT)": list(result_data['sheath_footage'].values())
+        }, key=f"fiber_sheaths_{idx}", column_config={
+            "Footage (FT)": st.column_config.NumberColumn(format="%.2f")
+        })
+    else:
+        st.write("No sheaths found.")
 
-    # If we have temporary parsed data, show it and ask for starting location
-    if 'temp_wave_data' in st.session_state:
-        temp_data = st.session_state['temp_wave_data']
-        st.markdown("#### Parsed Routes (Duplicates Removed)")
-        for route in temp_data['routes']:
-            st.text(route)
-
-        with st.form(key=f"wave_start_form_{len(st.session_state.wave_history)}"):
-            start_loc = st.text_input("Enter starting location code (8 characters)", key=f"wave_start_new_{len(st.session_state.wave_history)}")
-            start_submitted = st.form_submit_button("Build Path")
-            if start_submitted and start_loc:
-                path, changes, summary = build_wave_path(temp_data['routes'], start_loc)
-                
-                # Save to history
-                st.session_state.wave_history.append((
-                    temp_data['input'],
-                    temp_data['routes'],
-                    start_loc,
-                    path,
-                    summary
-                ))
-                
-                # Clear temporary data
-                del st.session_state['temp_wave_data']
-                st.rerun()
+    st.subheader("Sheath Fibers Available (<20)")
+    if result_data['sheath_fiber_avail']:
+        show_table({
+            "Sheath": [sheath for sheath, _ in result_data['sheath_fiber_avail']],
+            "Fibers Available": [avail for _, avail in result_data['sheath_fiber_avail']]
+        }, key=f"fiber_avail_{idx}")
+    else:
+        st.write("No sheaths with <20 fibers available found.")
+
+    st.divider()
 
 def fiber_sheath_parser():
     st.header("Fiber Sheath Parser")
@@ -430,100 +391,334 @@ def fiber_sheath_parser():
     st.markdown(description)
 
     # Show all previous parses
-    for idx, (input_text, result_data) in enumerate(st.session_state.fiber_history):
-        st.subheader(f"Fiber Parse #{idx+1}")
-        st.text_area(f"Input #{idx+1}", input_text, height=150, key=f"fiber_input_{idx}", disabled=True)
-        
-        # Display the results
-        st.subheader("Total Route Distance")
-        st.markdown(f"<p style='color:blue'>Total Footage: <b>{result_data['total_footage']:.2f} FT</b></p>", unsafe_allow_html=True)
-        st.markdown(f"<p style='color:green'>Total Miles: <b>{result_data['total_miles']:.2f} miles</b></p>", unsafe_allow_html=True)
-        st.markdown(f"<p style='color:purple'>Total Kilometers: <b>{result_data['total_km']:.2f} km</b></p>", unsafe_allow_html=True)
-        st.markdown(f"Estimated optical distance: <b>{result_data['estimated_optical_km']:.2f} km</b> <span style='color:red'>(13% added for slack, splices, and slack loops)</span>", unsafe_allow_html=True)
-
-        st.subheader("EXPANDED Fiber route as described by Cable Names")
-        if result_data['cable_names']:
-            for cable in result_data['cable_names']:
-                st.write(f"- {cable}")
-        else:
-            st.write("No cable names found.")
-
-        st.subheader("Detailed Cable Path with Individual Segments")
-        if result_data['unique_sheaths']:
-            for sheath, footage in result_data['sheath_footage'].items():
-                st.write(f"  - {sheath}: {footage:.2f} FT")
-        else:
-            st.write("No sheaths found.")
-
-        st.subheader("Sheath Fibers Available (<20)")
-        if result_data['sheath_fiber_avail']:
-            for sheath, avail in result_data['sheath_fiber_avail']:
-                st.write(f"- {sheath}: {avail}")
-        else:
-            st.write("No sheaths with <20 fibers available found.")
-        
-        st.divider()
-
-    st.markdown("Paste your fiber data below (raw text, as copied):")
-
-    # New input form
-    with st.form(key=f"fiber_form_{len(st.session_state.fiber_history)}"):
-        data = st.text_area("Paste fiber data here", height=400, key=f"fiber_data_input_{len(st.session_state.fiber_history)}")
-        submitted = st.form_submit_button("Parse Fiber Data")
-
-        if submitted and data.strip():
-            unique_sheaths = []
-            seen_sheaths = set()
-            sheath_fiber_avail = []
-            cable_names = []
-            seen_cables = set()
-            sheath_footage = {}
-            total_footage = 0.0
-            lines = data.splitlines()
-            current_sheath = None
-
-            for i, line in enumerate(lines):
-                match = re.search(r'Sheath:\s*([^\(]+(?:\([^)]+\))?)', line)
-                if match:
-                    current_sheath = match.group(1).strip()
-                    if current_sheath not in seen_sheaths:
-                        unique_sheaths.append(current_sheath)
-                        seen_sheaths.add(current_sheath)
-                        sheath_footage[current_sheath] = 0.0
-                    base_cable = re.sub(r'\s*\([^)]+\)$', '', current_sheath).strip()
-                    if base_cable not in seen_cables:
-                        cable_names.append(base_cable)
-                        seen_cables.add(base_cable)
-                footage_match = re.search(r'(\d+\.\d+)\s+FT', line)
-                if footage_match and current_sheath:
-                    footage = float(footage_match.group(1))
-                    sheath_footage[current_sheath] += footage
-                    total_footage += footage
-                avail_match = re.search(r'Sheath Fibers Available\s*:\s*(\d+)', line)
-                if avail_match and current_sheath:
-                    avail = int(avail_match.group(1))
-                    if avail < 20:
-                        sheath_fiber_avail.append((current_sheath, avail))
-
-            total_miles = total_footage / 5280
-            total_km = total_footage * 0.0003048
-            estimated_optical_km = total_km * 1.13
-
-            # Store results
-            result_data = {
-                'total_footage': total_footage,
-                'total_miles': total_miles,
-                'total_km': total_km,
-                'estimated_optical_km': estimated_optical_km,
-                'cable_names': cable_names,
-                'unique_sheaths': unique_sheaths,
-                'sheath_footage': sheath_footage,
-                'sheath_fiber_avail': sheath_fiber_avail
-            }
-
-            # Save to history
-            st.session_state.fiber_history.append((data, result_data))
-            st.rerun()
+    with stage("render.history"):
+        for idx, (input_text, result_data) in enumerate(st.session_state.fiber_history):
+            render_fiber_result(idx, input_text, result_data)
+    st.session_state.fiber_rendered = len(st.session_state.fiber_history)
+
+    show_job_panel("Fiber Sheath Parser", finish_fiber_job, render_new_fiber_results)
+    fiber_sheath_fragment()
+
+def finish_fiber_job(job, result):
+    # Save to history
+    st.session_state.fiber_history.append((job['context']['input'], result))
+
+def render_new_fiber_results():
+    # Parses finished since the last full run are only rendered by the job panel
+    history = st.session_state.fiber_history
+    for idx in range(st.session_state.fiber_rendered, len(history)):
+        render_fiber_result(idx, *history[idx])
+
+@st.fragment
+def fiber_sheath_fragment():
+    with timed_run("Fiber Sheath Parser"):
+        history = st.session_state.fiber_history
+
+        st.markdown("Paste your fiber data below (raw text, as copied):")
+
+        # New input form
+        with st.form(key=f"fiber_form_{len(history)}", clear_on_submit=True):
+            data = st.text_area("Paste fiber data here", height=400, key=f"fiber_data_input_{len(history)}")
+            incremental = st.checkbox("Incremental re-parse (reuse unchanged sheaths)", value=True,
+                                      key=f"fiber_incremental_{len(history)}")
+            submitted = st.form_submit_button("Parse Fiber Data")
+
+            if submitted and data.strip():
+                parser = session_parser('fiber_incremental_parser', IncrementalSheathParser)
+                if incremental and worth_reusing(parser, data):
+                    start_job("Fiber Sheath Parser", "fiber", "Parsing fiber sheaths", parser.parse,
+                              data, context={'input': data}, local=True)
+                else:
+                    # Very large exports are split at Sheath: lines across processes
+                    start_job("Fiber Sheath Parser", "fiber", "Parsing fiber sheaths", parse_fiber_sheaths_parallel,
+                              data, context={'input': data})
+                rerun_after_submit("Fiber Sheath Parser")
+
+def render_reconcile_result(idx, results):
+    st.subheader(f"Reconciliation #{idx+1}")
+    show_table({
+        "Circuit": [name for name, _ in results],
+        "XLR": [result['xlr_facilities'] for _, result in results],
+        "Wave": [result['wave_facilities'] for _, result in results],
+        "Matched": [result['matched'] for _, result in results],
+        "Missing from wave": [len(result['missing_from_wave']) for _, result in results],
+        "Missing from XLR": [len(result['missing_from_xlr']) for _, result in results],
+        "Out of order": [len(result['out_of_order']) for _, result in results],
+    }, key=f"reconcile_summary_{idx}")
+    rows = issue_rows(results)
+    if rows:
+        st.markdown("#### Discrepancies")
+        show_table({column: [row[column] for row in rows] for column in rows[0]}, key=f"reconcile_issues_{idx}")
+    else:
+        st.success("Every XLR facility matches the wave route, in order.")
+    st.divider()
+
+def show_reconciliation():
+    st.header("Circuit Reconciliation")
+
+    if "reconcile_history" not in st.session_state:
+        st.session_state.reconcile_history = []
+
+    st.markdown("""
+    Compares the Network Facilities of an XLR with the fiber facilities of a ZDAF wave route. Facilities are matched by their CLLI pair and fiber type, in either direction.
+
+    Paste one circuit below, or upload several XLR and wave files at once; files are paired by name (e.g. `CKT123.txt` in both uploads).
+    """)
+
+    with stage("render.history"):
+        for idx, results in enumerate(st.session_state.reconcile_history):
+            render_reconcile_result(idx, results)
+    st.session_state.reconcile_rendered = len(st.session_state.reconcile_history)
+
+    show_job_panel("Circuit Reconciliation", finish_reconcile_job, render_new_reconcile_results)
+    reconciliation_fragment()
+
+def finish_reconcile_job(job, result):
+    st.session_state.reconcile_history.append(result)
+
+def render_new_reconcile_results():
+    # Batches finished since the last full run are only rendered by the job panel
+    history = st.session_state.reconcile_history
+    for idx in range(st.session_state.reconcile_rendered, len(history)):
+        render_reconcile_result(idx, history[idx])
+
+def pair_uploads(xlr_files, wave_files):
+    """Pair uploaded XLR and wave files by file name without extension."""
+    def stem(upload):
+        return upload.name.rsplit('.', 1)[0]
+    waves = {stem(upload): upload for upload in wave_files}
+    circuits, unpaired = [], []
+    for upload in xlr_files:
+        wave = waves.pop(stem(upload), None)
+        if wave is None:
+            unpaired.append(upload.name)
+            continue
+        circuits.append((stem(upload), upload.getvalue().decode('utf-8', errors='replace'),
+                         wave.getvalue().decode('utf-8', errors='replace')))
+    unpaired.extend(upload.name for upload in waves.values())
+    return circuits, unpaired
+
+@st.fragment
+def reconciliation_fragment():
+    with timed_run("Circuit Reconciliation"):
+        history = st.session_state.reconcile_history
+
+        with st.form(key=f"reconcile_form_{len(history)}", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            xlr_text = col1.text_area("XLR text", height=200, key=f"reconcile_xlr_{len(history)}")
+            wave_text = col2.text_area("Wave route data", height=200, key=f"reconcile_wave_{len(history)}")
+            xlr_files = col1.file_uploader("XLR files", type=["txt"], accept_multiple_files=True,
+                                           key=f"reconcile_xlr_files_{len(history)}")
+            wave_files = col2.file_uploader("Wave route files", type=["txt"], accept_multiple_files=True,
+                                            key=f"reconcile_wave_files_{len(history)}")
+            match_type = st.checkbox("Match facility type (wave routes only list FIBER; XLRs usually list rates such as 100G)",
+                                     value=False, key=f"reconcile_match_type_{len(history)}")
+            submitted = st.form_submit_button("Reconcile")
+
+            if submitted:
+                circuits, unpaired = pair_uploads(xlr_files or [], wave_files or [])
+                if xlr_text.strip() and wave_text.strip():
+                    circuits.insert(0, ("Pasted circuit", xlr_text, wave_text))
+                if unpaired:
+                    st.warning(f"No matching file for: {', '.join(unpaired)}")
+                if circuits:
+                    start_job("Circuit Reconciliation", "reconcile", f"Reconciling {len(circuits)} circuit(s)",
+                              reconcile_circuits, circuits, match_type=match_type)
+                    rerun_after_submit("Circuit Reconciliation")
+                elif not unpaired:
+                    st.warning("Paste an XLR and a wave route, or upload files to compare.")
+
+def render_footage_result(idx, kmz_name, result):
+    st.subheader(f"Footage Reconciliation #{idx+1}: {kmz_name}")
+    totals = result['totals']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Matched Sheaths", f"{totals['matched']} / {totals['sheaths']}")
+    col2.metric("Matched Sheath Footage", f"{totals['matched_sheath_ft']:,.0f} FT")
+    col3.metric("Matched KMZ Footage", f"{totals['matched_kmz_ft']:,.0f} FT")
+    col4.metric("Delta", f"{totals['delta_ft']:,.0f} FT")
+    st.caption(f"All sheaths: {totals['sheath_ft']:,.0f} FT | All placemarks: {totals['kmz_ft']:,.0f} FT")
+
+    feet = st.column_config.NumberColumn(format="%.2f")
+    st.markdown("#### Per Cable")
+    cables = result['cables']
+    show_table({
+        "Cable": [row['cable'] for row in cables],
+        "Sheaths": [row['sheaths'] for row in cables],
+        "Matched": [row['matched'] for row in cables],
+        "Sheath FT": [row['matched_sheath_ft'] for row in cables],
+        "KMZ FT": [row['kmz_ft'] for row in cables],
+        "Delta FT": [row['delta_ft'] for row in cables],
+        "Delta %": [row['delta_pct'] for row in cables],
+    }, key=f"footage_cables_{idx}", column_config={
+        "Sheath FT": feet, "KMZ FT": feet, "Delta FT": feet,
+        "Delta %": st.column_config.NumberColumn(format="%.1f%%"),
+    })
+
+    st.markdown("#### Per Sheath")
+    sheaths = result['sheaths']
+    show_table({
+        "Sheath": [row['sheath'] for row in sheaths],
+        "Placemark": [row['placemark'] for row in sheaths],
+        "Match": [row['match'] for row in sheaths],
+        "Sheath FT": [row['sheath_ft'] for row in sheaths],
+        "KMZ FT": [row['kmz_ft'] for row in sheaths],
+        "Delta FT": [row['delta_ft'] for row in sheaths],
+    }, key=f"footage_sheaths_{idx}", column_config={"Sheath FT": feet, "KMZ FT": feet, "Delta FT": feet})
+
+    unmatched = result['unmatched_placemarks']
+    if unmatched:
+        st.markdown("#### Placemarks Without a Sheath")
+        show_table({
+            "Placemark": [row['placemark'] for row in unmatched],
+            "Calculated FT": [row['calculated_ft'] for row in unmatched],
+        }, key=f"footage_unmatched_{idx}", column_config={"Calculated FT": feet})
+    st.divider()
+
+def show_footage_reconciliation():
+    st.header("Sheath vs KMZ Footage")
+
+    if "footage_history" not in st.session_state:
+        st.session_state.footage_history = []
+
+    st.markdown("""
+    Matches IQGeo sheath footage to the geometry length of KMZ placemarks with the same (or a close) name, and totals the differences per cable.
+
+    Paste the IQGeo fiber data as for the Fiber Sheath Parser and upload the design KMZ or KML.
+    """)
+
+    with stage("render.history"):
+        for idx, (kmz_name, result) in enumerate(st.session_state.footage_history):
+            render_footage_result(idx, kmz_name, result)
+    st.session_state.footage_rendered = len(st.session_state.footage_history)
+
+    show_job_panel("Sheath vs KMZ Footage", finish_footage_job, render_new_footage_results)
+    footage_fragment()
+
+def finish_footage_job(job, result):
+    st.session_state.footage_history.append((job['context']['kmz_name'], result))
+
+def render_new_footage_results():
+    # Results finished since the last full run are only rendered by the job panel
+    history = st.session_state.footage_history
+    for idx in range(st.session_state.footage_rendered, len(history)):
+        render_footage_result(idx, *history[idx])
+
+@st.fragment
+def footage_fragment():
+    with timed_run("Sheath vs KMZ Footage"):
+        history = st.session_state.footage_history
+        fiber_history = st.session_state.get("fiber_history", [])
+
+        with st.form(key=f"footage_form_{len(history)}", clear_on_submit=True):
+            fiber_text = st.text_area("Paste fiber data here", height=250, key=f"footage_fiber_{len(history)}")
+            if fiber_history:
+                st.caption("Leave empty to use the latest Fiber Sheath Parser input.")
+            kmz_file = st.file_uploader("Upload KMZ or KML", type=["kmz", "kml"], key=f"footage_kmz_{len(history)}")
+            submitted = st.form_submit_button("Reconcile Footage")
+
+            if submitted:
+                if not fiber_text.strip() and fiber_history:
+                    fiber_text = fiber_history[-1][0]
+                if not fiber_text.strip() or kmz_file is None:
+                    st.warning("Fiber data and a KMZ or KML file are both needed.")
+                else:
+                    start_job("Sheath vs KMZ Footage", "footage", f"Reconciling {kmz_file.name}",
+                              reconcile_footage_inputs, fiber_text, kmz_file.name, kmz_file.getvalue(),
+                              context={'kmz_name': kmz_file.name})
+                    rerun_after_submit("Sheath vs KMZ Footage")
+
+DIFF_KINDS = {
+    "Wave routes (ZDAF)": 'wave',
+    "Fiber sheaths (IQGeo)": 'fiber',
+    "KMZ placemarks": 'kmz',
+}
+
+def render_diff_result(idx, label, kind, result):
+    st.subheader(f"Comparison #{idx+1}: {label}")
+    summary = result['summary']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Unchanged", f"{summary['unchanged']:,}")
+    col2.metric("Changed", f"{summary['changed']:,}")
+    col3.metric("Removed", f"{summary['removed']:,}")
+    col4.metric("Added", f"{summary['added']:,}")
+    caption = f"Old: {summary['old']:,} items | New: {summary['new']:,} items"
+    if 'delta_ft' in summary:
+        caption += f" | Footage {summary['old_ft']:,.2f} FT -> {summary['new_ft']:,.2f} FT ({summary['delta_ft']:+,.2f} FT)"
+    st.caption(caption)
+
+    rows = result['rows']
+    if rows:
+        feet = st.column_config.NumberColumn(format="%.2f")
+        show_table({
+            column: [row[column] for row in rows] for column in DIFF_COLUMNS[kind]
+        }, key=f"diff_rows_{idx}", column_config={"old_ft": feet, "new_ft": feet, "delta_ft": feet})
+    else:
+        st.success("No differences.")
+    st.divider()
+
+def show_export_diff():
+    st.header("Compare Exports")
+
+    if "diff_history" not in st.session_state:
+        st.session_state.diff_history = []
+
+    st.markdown("""
+    Lists what was added, removed or changed between an earlier and a later export of the same route.
+
+    Wave facilities are matched by their two locations, sheaths by name (with footage deltas) and placemarks by name (with a geometry check).
+    """)
+
+    with stage("render.history"):
+        for idx, entry in enumerate(st.session_state.diff_history):
+            render_diff_result(idx, *entry)
+    st.session_state.diff_rendered = len(st.session_state.diff_history)
+
+    show_job_panel("Compare Exports", finish_diff_job, render_new_diff_results)
+    diff_fragment()
+
+def finish_diff_job(job, result):
+    context = job['context']
+    st.session_state.diff_history.append((context['label'], context['kind'], result))
+
+def render_new_diff_results():
+    # Results finished since the last full run are only rendered by the job panel
+    history = st.session_state.diff_history
+    for idx in range(st.session_state.diff_rendered, len(history)):
+        render_diff_result(idx, *history[idx])
+
+@st.fragment
+def diff_fragment():
+    with timed_run("Compare Exports"):
+        history = st.session_state.diff_history
+        kind_label = st.radio("Export type", list(DIFF_KINDS), horizontal=True, key="diff_kind")
+        kind = DIFF_KINDS[kind_label]
+
+        with st.form(key=f"diff_form_{len(history)}", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            if kind == 'kmz':
+                old_file = col1.file_uploader("Earlier KMZ or KML", type=["kmz", "kml"], key=f"diff_old_{len(history)}")
+                new_file = col2.file_uploader("Later KMZ or KML", type=["kmz", "kml"], key=f"diff_new_{len(history)}")
+            else:
+                old_text = col1.text_area("Earlier export", height=250, key=f"diff_old_{len(history)}")
+                new_text = col2.text_area("Later export", height=250, key=f"diff_new_{len(history)}")
+            submitted = st.form_submit_button("Compare")
+
+            if submitted:
+                if kind == 'kmz':
+                    ready = old_file is not None and new_file is not None
+                    if ready:
+                        old = (old_file.name, old_file.getvalue())
+                        new = (new_file.name, new_file.getvalue())
+                        label = f"{old_file.name} vs {new_file.name}"
+                else:
+                    ready = bool(old_text.strip() and new_text.strip())
+                    old, new, label = old_text, new_text, kind_label
+                if not ready:
+                    st.warning("Both an earlier and a later export are needed.")
+                else:
+                    start_job("Compare Exports", "diff", f"Comparing {label}", DIFFS[kind], old, new,
+                              context={'label': label, 'kind': kind})
+                    rerun_after_submit("Compare Exports")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
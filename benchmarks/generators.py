@@ -0,0 +1,175 @@
+"""Synthetic inputs shaped like the real exports, at any size.
+
+Every generator is deterministic for a given seed so benchmark runs are
+comparable, and can also be run directly to write sample files:
+
+    python benchmarks/generators.py zdaf 5000 > wave.txt
+    python benchmarks/generators.py kmz 2000 --out design.kmz
+"""
+import argparse
+import io
+import random
+import string
+import sys
+import zipfile
+
+CLLI_CHARS = string.ascii_uppercase + string.digits
+
+
+def make_cllis(count, rng):
+    """Unique 8-character CLLI codes, e.g. DLLSTXAB."""
+    cllis = set()
+    while len(cllis) < count:
+        cllis.add("".join(rng.choice(string.ascii_uppercase) for _ in range(6))
+                  + "".join(rng.choice(CLLI_CHARS) for _ in range(2)))
+    return sorted(cllis)
+
+
+def zdaf_dump(segments, seed=0, duplicate_rate=0.1, null_rate=0.02, system_change_rate=0.1,
+              branch_rate=0.05, max_spur=3):
+    """A ZDAF wave 'Fiber' dump: a chained route of fiber facilities with spurs, plus noise lines.
+
+    Both ends of a facility are on the same system; a system change switches
+    the suffix at the CLLI two consecutive facilities share, which is where
+    the path builders look for it. A branch adds a dead-end spur of up to
+    max_spur facilities leaving a CLLI of the main route; spur lines follow
+    the main route's departure from that CLLI, so a greedy walk keeps to the
+    main route and only a full coverage walk has to take them.
+    """
+    rng = random.Random(seed)
+    spur_budget = int(segments * branch_rate * max_spur) + max_spur
+    cllis = make_cllis(segments + 1 + spur_budget, rng)
+    spur_cllis = iter(cllis[segments + 1:])
+    suffix = "A"
+    lines = ["Seq Number Facility Type Status A-End Z-End"]
+
+    def add(seq, clli1, suffix1, clli2, suffix2):
+        fiber_type = rng.choice(["FIBERL", "FIBERM", "FIBERS"])
+        loc1 = f"{clli1}{suffix1}{rng.randint(1, 9):02d}"
+        loc2 = f"{clli2}{suffix2}{rng.randint(1, 9):02d}"
+        line = f"{seq} {rng.randint(1, 999)} /{fiber_type}/{loc1}/{loc2} ACTIVE {clli1} {clli2}"
+        lines.append(line)
+        if rng.random() < duplicate_rate:
+            lines.append(line)
+        if rng.random() < null_rate:
+            lines.append(f"{seq} {rng.randint(1, 999)} /{fiber_type}/{loc1}/{loc2} PENDING null null")
+
+    for i in range(segments):
+        if i and rng.random() < system_change_rate:
+            suffix = rng.choice("ABCD".replace(suffix, ""))
+        add(i + 1, cllis[i], suffix, cllis[i + 1], suffix)
+        if i and rng.random() < branch_rate:
+            clli, spur_suffix = cllis[i], rng.choice("ABCD")
+            for _ in range(rng.randint(1, max_spur)):
+                spur = next(spur_cllis, None)
+                if spur is None:
+                    break
+                add(i + 1, clli, spur_suffix, spur, spur_suffix)
+                clli = spur
+        if rng.random() < 0.05:
+            lines.append(f"{i + 1} 0 /OC48/{cllis[i]}/{cllis[i + 1]} ACTIVE x y")
+    return "\n".join(lines)
+
+
+def iqgeo_grid(sheaths, rows_per_sheath=4, seed=0, low_fiber_rate=0.2):
+    """An IQGeo fiber propagation grid copied as text."""
+    rng = random.Random(seed)
+    lines = ["Fiber Propagations", "Name\tType\tLength\tDetails"]
+    cable_count = max(1, sheaths // 5)
+    for i in range(sheaths):
+        cable = f"CBL-{rng.randint(1, cable_count):05d}"
+        lines.append(f"Sheath: {cable} (SEG {i % 97 + 1})\tSheath\t\t")
+        for _ in range(rows_per_sheath):
+            lines.append(f"Segment\tRoute\t{rng.uniform(10, 5000):.2f} FT\tUG")
+        avail = rng.randint(0, 19) if rng.random() < low_fiber_rate else rng.randint(20, 288)
+        lines.append(f"Sheath Fibers Available : {avail}")
+        lines.append(f"Splice Closure\tSC-{i:06d}\t\t")
+    return "\n".join(lines)
+
+
+def xlr_text(clli_rows, facilities=None, seed=0):
+    """An XLR circuit record with key fields, a CLLI address table and network facilities."""
+    rng = random.Random(seed)
+    facilities = clli_rows if facilities is None else facilities
+    cllis = make_cllis(max(clli_rows, 2), rng)
+    a_clli, z_clli = cllis[0], cllis[-1]
+    lines = [
+        "Service Name\tWAVE-100G-EXAMPLE",
+        f"Circuit ID\t{rng.randint(10, 99)}/KQGN/{rng.randint(100000, 999999)}//ZYO",
+        "Account Name\tExample Networks LLC",
+        "Product Group\tWavelengths",
+        "Product\tStandard Wavelength",
+        "Product Category\tTransport",
+        "Rate Code\t100G",
+        f"A-Clli\t{a_clli}",
+        f"A-Address\t{rng.randint(1, 9999)} Main St",
+        f"Z-Clli\t{z_clli}",
+        f"Z-Address\t{rng.randint(1, 9999)} Elm St",
+        "",
+        "Network Facilities",
+    ]
+    for i in range(facilities):
+        loc1 = cllis[i % len(cllis)]
+        loc2 = cllis[(i + 1) % len(cllis)]
+        lines.append(f"{rng.randint(1, 96)} /100G /{loc1}/{loc2}\tIn Service")
+    lines.append("")
+    lines.append("CLLI\tAddress\tCity\tState\tZip")
+    for clli in cllis[:clli_rows]:
+        lines.append(f"{clli}01\t{rng.randint(1, 9999)} Commerce Dr\tDallas\tTX\t{rng.randint(75000, 75999)}")
+    return "\n".join(lines)
+
+
+def kml_document(placemarks, vertices=50, seed=0):
+    """KML text with LineString placemarks whose descriptions carry an entered footage."""
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<kml xmlns="http://www.opengis.net/kml/2.2"><Document><name>Synthetic design</name>']
+    for i in range(placemarks):
+        lon, lat = -97.0 + rng.uniform(-1, 1), 32.0 + rng.uniform(-1, 1)
+        coords = []
+        for _ in range(vertices):
+            lon += rng.uniform(-0.001, 0.001)
+            lat += rng.uniform(-0.001, 0.001)
+            coords.append(f"{lon:.6f},{lat:.6f},0")
+        parts.append(
+            f"<Placemark><name>CBL-{i // 5:05d} (SEG {i % 5 + 1})</name>"
+            f"<description><![CDATA[<b>Footage:</b> {rng.uniform(100, 20000):,.1f}]]></description>"
+            f"<LineString><coordinates>{' '.join(coords)}</coordinates></LineString></Placemark>"
+        )
+    parts.append("</Document></kml>")
+    return "\n".join(parts)
+
+
+def kmz_bytes(placemarks, vertices=50, seed=0):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as kmz:
+        kmz.writestr("doc.kml", kml_document(placemarks, vertices, seed))
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=["zdaf", "iqgeo", "xlr", "kml", "kmz"])
+    parser.add_argument("size", type=int, help="segments, sheaths, CLLI rows or placemarks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vertices", type=int, default=50, help="vertices per KMZ placemark")
+    parser.add_argument("--out", help="write to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.kind == "kmz":
+        data = kmz_bytes(args.size, args.vertices, args.seed)
+    elif args.kind == "kml":
+        data = kml_document(args.size, args.vertices, args.seed).encode("utf-8")
+    else:
+        generator = {"zdaf": zdaf_dump, "iqgeo": iqgeo_grid, "xlr": xlr_text}[args.kind]
+        data = generator(args.size, seed=args.seed).encode("utf-8")
+
+    if args.out:
+        with open(args.out, "wb") as fh:
+            fh.write(data)
+    else:
+        sys.stdout.buffer.write(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Parser benchmark harness with a results history and regression flagging.
+
+Times the wave, fiber, XLR and KMZ parsers on synthetic inputs from
+generators.py. Each run is appended to benchmarks/results.jsonl and compared
+with the median of earlier runs of the same case on this machine:
+
+    python benchmarks/run_benchmarks.py                  # medium inputs
+    python benchmarks/run_benchmarks.py --size large --repeat 7
+    python benchmarks/run_benchmarks.py --only wave --threshold 0.1
+    python benchmarks/run_benchmarks.py --no-save        # compare without recording
+
+Exits with status 1 when any case is slower than its baseline by more than
+--threshold (a fraction, default 0.25).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import generators  # noqa: E402
+from worktools.fiber_sheath import parse_fiber_sheaths  # noqa: E402
+from worktools.kmz_lengths import process_kml, read_kml  # noqa: E402
+from worktools.wave_routes import build_full_coverage_path, build_wave_path, parse_wave_routes  # noqa: E402
+from worktools.xlr import parse_xlr  # noqa: E402
+
+RESULTS_FILE = os.path.join(BENCH_DIR, "results.jsonl")
+
+# Input sizes per preset: wave segments, path segments, sheaths, XLR CLLI rows, KMZ placemarks
+SIZES = {
+    "small": {"wave": 1000, "path": 500, "fiber": 500, "xlr": 200, "kmz": 200},
+    "medium": {"wave": 20000, "path": 2000, "fiber": 5000, "xlr": 2000, "kmz": 1000},
+    "large": {"wave": 200000, "path": 5000, "fiber": 50000, "xlr": 20000, "kmz": 5000},
+}
+
+
+def build_cases(sizes):
+    """Return (name, group, size, setup) where setup() returns the zero-argument callable to time."""
+    def wave_parse():
+        text = generators.zdaf_dump(sizes["wave"])
+        return lambda: parse_wave_routes(text)
+
+    def wave_path():
+        routes = parse_wave_routes(generators.zdaf_dump(sizes["path"]))
+        start = routes[0].clli1
+        return lambda: build_wave_path(routes, start)
+
+    def wave_coverage():
+        routes = parse_wave_routes(generators.zdaf_dump(sizes["wave"]))
+        return lambda: build_full_coverage_path(routes, routes[0].clli1)
+
+    def fiber():
+        text = generators.iqgeo_grid(sizes["fiber"])
+        return lambda: parse_fiber_sheaths(text)
+
+    def xlr():
+        text = generators.xlr_text(sizes["xlr"])
+        return lambda: parse_xlr(text)
+
+    def kmz():
+        data = generators.kmz_bytes(sizes["kmz"])
+        return lambda: process_kml(read_kml("bench.kmz", data))
+
+    return [
+        ("parse_wave_routes", "wave", sizes["wave"], wave_parse),
+        ("build_wave_path", "wave", sizes["path"], wave_path),
+        ("build_full_coverage_path", "wave", sizes["wave"], wave_coverage),
+        ("parse_fiber_sheaths", "fiber", sizes["fiber"], fiber),
+        ("parse_xlr", "xlr", sizes["xlr"], xlr),
+        ("process_kml", "kmz", sizes["kmz"], kmz),
+    ]
+
+
+def time_case(func, repeat):
+    func()  # warm up caches and lazy imports
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def baseline_for(history, case, size, machine, window=5):
+    """Median of the last few recorded medians for this case, size and machine."""
+    previous = [r["median_s"] for r in history
+                if r["case"] == case and r["size"] == size and r["machine"] == machine]
+    if not previous:
+        return None
+    return statistics.median(previous[-window:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="medium")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", action="append", choices=["wave", "fiber", "xlr", "kmz"],
+                        help="limit to a parser group (repeatable)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="flag cases slower than baseline by more than this fraction")
+    parser.add_argument("--results", default=RESULTS_FILE, help="results history file")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    args = parser.parse_args()
+
+    history = load_history(args.results)
+    machine = f"{platform.node()}/{platform.machine()}/py{platform.python_version()}"
+    revision = git_revision()
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    results = []
+    regressions = []
+    print(f"{'Case':<26} {'Size':>8} {'Median (s)':>11} {'Min (s)':>9} {'Baseline':>9} {'Change':>8}")
+    for name, group, size, setup in build_cases(SIZES[args.size]):
+        if args.only and group not in args.only:
+            continue
+        samples = time_case(setup(), args.repeat)
+        median = statistics.median(samples)
+        baseline = baseline_for(history, name, size, machine)
+        change = (median - baseline) / baseline if baseline else None
+        flag = ""
+        if change is not None and change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<26} {size:>8} {median:>11.4f} {min(samples):>9.4f} "
+              f"{baseline if baseline is not None else float('nan'):>9.4f} "
+              f"{'' if change is None else f'{change:+.0%}':>8}{flag}")
+        results.append({
+            "ts": timestamp,
+            "revision": revision,
+            "machine": machine,
+            "case": name,
+            "size": size,
+            "repeat": args.repeat,
+            "median_s": median,
+            "min_s": min(samples),
+        })
+
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as fh:
+            for result in results:
+                fh.write(json.dumps(result) + "\n")
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
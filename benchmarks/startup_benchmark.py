@@ -0,0 +1,122 @@
+"""Startup-time benchmark for the Streamlit tools and pages.
+
+Every measurement runs in a fresh Python process so the import cost of a cold
+container start is included. Each child process renders one tool (or page)
+once through ``streamlit.testing.v1.AppTest`` and reports how long it took.
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --repeat 5 --budget 3.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (label, script, tool selected in the sidebar radio or None for pages)
+TARGETS = [
+    ("app: Wave Route Parser", "app.py", "Wave Route Parser"),
+    ("app: Fiber Sheath Parser", "app.py", "Fiber Sheath Parser"),
+    ("app: XLR Parser", "app.py", "XLR Parser"),
+    ("app: Circuit Reconciliation", "app.py", "Circuit Reconciliation"),
+    ("app: Sheath vs KMZ Footage", "app.py", "Sheath vs KMZ Footage"),
+    ("app: Compare Exports", "app.py", "Compare Exports"),
+    ("page: KMZ Length Cleaner", os.path.join("pages", "FIBERCO KMZ_Length_Cleaner.py"), None),
+]
+
+# Modules that should only be loaded once a tool actually needs them
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "xml.etree.ElementTree", "zipfile"]
+
+
+def run_child(script, tool):
+    """Render a single target once and print the timings as JSON."""
+    process_start = time.perf_counter()
+    # Pages live in pages/, so their own directory does not make worktools importable
+    sys.path.insert(0, REPO_ROOT)
+    from streamlit.testing.v1 import AppTest
+    streamlit_loaded = time.perf_counter()
+
+    at = AppTest.from_file(os.path.join(REPO_ROOT, script), default_timeout=60)
+    if tool:
+        at.session_state["selected_tool"] = tool
+    at.run()
+    rendered = time.perf_counter()
+
+    print(json.dumps({
+        "streamlit_import_s": streamlit_loaded - process_start,
+        "first_render_s": rendered - streamlit_loaded,
+        "total_s": rendered - process_start,
+        "exceptions": [str(e.value) for e in at.exception],
+        "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+    }))
+
+
+def measure(script, tool):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", script]
+    if tool:
+        cmd += ["--tool", tool]
+    wall_start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - wall_start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} ({tool}) failed:\n{proc.stderr}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_wall_s"] = wall
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts per target (median is reported)")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="fail if any target's median first render exceeds this many seconds")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--tool", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.tool)
+        return 0
+
+    report = []
+    for label, script, tool in TARGETS:
+        runs = [measure(script, tool) for _ in range(args.repeat)]
+        report.append({
+            "target": label,
+            "first_render_s": statistics.median(r["first_render_s"] for r in runs),
+            "total_s": statistics.median(r["total_s"] for r in runs),
+            "process_wall_s": statistics.median(r["process_wall_s"] for r in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+            "exceptions": runs[-1]["exceptions"],
+        })
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'Target':<28} {'Render (s)':>10} {'Total (s)':>10} {'Wall (s)':>10}  Heavy modules loaded")
+        for row in report:
+            print(f"{row['target']:<28} {row['first_render_s']:>10.3f} {row['total_s']:>10.3f} "
+                  f"{row['process_wall_s']:>10.3f}  {', '.join(row['heavy_modules']) or '-'}")
+            for exc in row["exceptions"]:
+                print(f"    exception: {exc}")
+
+    failed = False
+    if args.budget is not None:
+        for row in report:
+            if row["first_render_s"] > args.budget:
+                print(f"REGRESSION: {row['target']} took {row['first_render_s']:.3f}s "
+                      f"(budget {args.budget:.3f}s)", file=sys.stderr)
+                failed = True
+    if any(row["exceptions"] for row in report):
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
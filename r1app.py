@@ -1,7 +1,11 @@
+import hashlib
 import streamlit as st
-import pandas as pd
-from datetime import datetime
-import re
+
+from worktools.csv_stats import csv_summary, file_digest, read_preview
+from worktools.notes import NOTES_OWNER, PAGE_SIZE as NOTES_PAGE_SIZE, NoteStore
+from worktools.streamlit_jobs import get_job_manager, session_jobs, show_job_panel, start_job
+from worktools.text_stats import TOP_TERMS, analyze_bytes
+from worktools.wave_routes import build_wave_path, parse_wave_routes, routes_digest
 
 # Set page config
 st.set_page_config(
@@ -20,13 +24,11 @@ if 'spaces' not in st.session_state:
         },
         'Medical Research': {
             'type': 'research',
-            'description': 'Personal health research and notes',
-            'notes': []
+            'description': 'Personal health research and notes'
         },
         'Study Notes': {
             'type': 'research',
-            'description': 'General study and learning notes',
-            'notes': []
+            'description': 'General study and learning notes'
         }
     }
 
@@ -64,9 +66,11 @@ def create_new_space():
         if space_name and space_name not in st.session_state.spaces:
             st.session_state.spaces[space_name] = {
                 'type': space_type,
-                'description': space_description,
-                'tools' if space_type == 'tool' else 'notes': [] if space_type == 'research' else ['Basic Processor']
+                'description': space_description
             }
+            # Research notes are kept in the note store, keyed by space name
+            if space_type == 'tool':
+                st.session_state.spaces[space_name]['tools'] = ['Basic Processor']
             st.sidebar.success(f"Created new space: {space_name}")
 
 def show_tool_space(space_name):
@@ -83,232 +87,164 @@ def show_tool_space(space_name):
     elif selected_tool == "Wave Route Parser":
         show_wave_route_parser()
 
+@st.cache_resource
+def owner_note_store(owner):
+    # One SQLite connection per owner, shared by their sessions
+    return NoteStore(owner=owner)
+
 def show_research_space(space_name):
     st.subheader("Research Notes")
+    # Signed-in users keep their own notes; everyone else shares the configured owner
+    if st.user.get('is_logged_in'):
+        store = owner_note_store(st.user.get('email') or st.user.get('sub'))
+    else:
+        store = owner_note_store(NOTES_OWNER)
+        st.caption("Notes are saved on this server and shared by everyone who is not signed in.")
 
     # Add new note
-    new_note = st.text_area("Add New Note")
-    if st.button("Save Note"):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        st.session_state.spaces[space_name]['notes'].append({
-            'timestamp': timestamp,
-            'content': new_note
-        })
-
-    # Display existing notes
-    for note in st.session_state.spaces[space_name]['notes']:
-        with st.expander(f"Note from {note['timestamp']}"):
+    with st.form("new_note", clear_on_submit=True):
+        new_note = st.text_area("Add New Note")
+        if st.form_submit_button("Save Note") and new_note.strip():
+            store.add(space_name, new_note)
+
+    query = st.text_input("Search notes")
+    if query:
+        all_spaces = st.checkbox("Search all my spaces", value=False)
+        show_note_search(store, query, None if all_spaces else space_name)
+        return
+
+    # Display existing notes one page at a time
+    total = store.count(space_name)
+    if not total:
+        st.info("No notes yet.")
+        return
+    page = note_page_picker(total, f"notes_page_{space_name}")
+    for note in store.page(space_name, page, NOTES_PAGE_SIZE):
+        with st.expander(f"Note from {note['created']}"):
+            st.write(note['content'])
+
+def show_note_search(store, query, space):
+    total = store.search_count(query, space)
+    if not total:
+        st.info("No matching notes.")
+        return
+    st.caption(f"{total:,} matching notes")
+    page = note_page_picker(total, f"notes_search_page_{space}")
+    for note in store.search(query, space, NOTES_PAGE_SIZE, page * NOTES_PAGE_SIZE):
+        st.markdown(f"**{note['space']}** · {note['created']}: {note.get('snippet') or note['content'][:200]}")
+        with st.expander("Full note"):
             st.write(note['content'])
 
+def note_page_picker(total, key):
+    pages = (total + NOTES_PAGE_SIZE - 1) // NOTES_PAGE_SIZE
+    if pages == 1:
+        return 0
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=key)
+    return page - 1
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_preview(digest, _fh):
+    # Keyed by the file hash only; the file object itself is not hashed
+    return read_preview(_fh)
+
+@st.cache_data(max_entries=8, show_spinner="Computing statistics in one pass over the file...")
+def cached_csv_summary(digest, _fh):
+    return csv_summary(_fh)
+
+def upload_digest(fh, cache_key):
+    # Hashing a large file takes a while, so remember it for this upload or file version
+    digests = st.session_state.setdefault('upload_digests', {})
+    if cache_key not in digests:
+        digests[cache_key] = file_digest(fh)
+    return digests[cache_key]
+
 def show_csv_processor():
     st.subheader("CSV Processor")
     uploaded_file = st.file_uploader("Upload CSV file", type=['csv'])
+    st.caption("Files over the upload limit: `python -m worktools csv FILE` prints the same statistics.")
 
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
-        st.write("Preview of your data:")
-        st.dataframe(df.head())
+        show_csv_file(uploaded_file, uploaded_file.file_id)
+
+def show_csv_file(fh, cache_key):
+    digest = upload_digest(fh, cache_key)
+
+    st.write("Preview of your data:")
+    st.dataframe(cached_preview(digest, fh))
+
+    if st.button("Show Basic Statistics"):
+        st.session_state['csv_stats_digest'] = digest
+    if st.session_state.get('csv_stats_digest') == digest:
+        summary = cached_csv_summary(digest, fh)
+        st.write(summary['stats'])
+        note = f"{summary['rows']:,} rows read in chunks with {summary['engine']}."
+        if summary['sampled']:
+            note += " Quartiles are estimated from a uniform sample of each column."
+        st.caption(note)
+
+TEXT_TOOL = "Text Analyzer"
 
-        if st.button("Show Basic Statistics"):
-            st.write(df.describe())
+def finish_text_job(job, result):
+    st.session_state.text_stats = (job['context']['digest'], result)
+    return True
+
+def fail_text_job(job, error):
+    st.session_state.text_error = (job['context']['digest'], error)
 
 def show_text_analyzer():
     st.subheader("Text Analyzer")
     text_input = st.text_area("Enter text to analyze")
+    uploaded_file = st.file_uploader("Or upload a text or log file")
+    st.caption("Files over the upload limit: `python -m worktools text FILE` prints the same statistics.")
 
-    if text_input:
-        word_count = len(text_input.split())
-        char_count = len(text_input)
-
-        col1, col2 = st.columns(2)
-        col1.metric("Word Count", word_count)
-        col2.metric("Character Count", char_count)
-
-def parse_facility_id(line):
-    """Parse a network facility ID into its components."""
-    # Regular expression to match the pattern: number /FIBERL/LOCATION1/LOCATION2
-    match = re.search(r'(\d+)\s+(/FIBER\w+/[A-Z0-9]+/[A-Z0-9]+)', line)
-    if not match:
-        return None
-
-    seq_num, facility = match.groups()
-
-    # Split facility into components
-    parts = facility.split('/')
-    if len(parts) != 4:  # Should be ['', 'FIBERL', 'LOC1', 'LOC2']
-        return None
-
-    _, fiber_type, loc1, loc2 = parts
-
-    # Extract location code (first 8 chars) and equipment suffix
-    loc1_code = loc1[:8]
-    loc1_suffix = loc1[8:]
-    loc2_code = loc2[:8]
-    loc2_suffix = loc2[8:]
-
-    return {
-        'seq_num': seq_num,
-        'full_facility': facility,
-        'fiber_type': fiber_type,
-        'loc1': {
-            'code': loc1_code,
-            'suffix': loc1_suffix,
-            'full': loc1
-        },
-        'loc2': {
-            'code': loc2_code,
-            'suffix': loc2_suffix,
-            'full': loc2
-        }
-    }
+    if uploaded_file is not None:
+        digest = upload_digest(uploaded_file, uploaded_file.file_id)
+    elif text_input:
+        digest = hashlib.sha256(text_input.encode('utf-8')).hexdigest()
+    else:
+        return
+
+    analyzed, stats = st.session_state.get('text_stats', (None, None))
+    if analyzed != digest:
+        if st.session_state.get('text_started') != digest:
+            # Only the latest input is shown, so stop analyses of earlier ones
+            for job in session_jobs(TEXT_TOOL):
+                get_job_manager().cancel(job['id'])
+            data = uploaded_file.getvalue() if uploaded_file is not None else text_input.encode('utf-8')
+            # Large files are analyzed on the shared worker pool so the page stays responsive
+            start_job(TEXT_TOOL, "text", "Analyzing text", analyze_bytes, data, context={'digest': digest})
+            st.session_state.text_started = digest
+        failed = st.session_state.get('text_error')
+        if session_jobs(TEXT_TOOL):
+            show_job_panel(TEXT_TOOL, finish_text_job, None, fail_text_job)
+        elif failed and failed[0] == digest:
+            st.error(f"Analyzing text failed: {failed[1]}")
+        else:
+            st.info("The analysis was cancelled. Change the text or upload the file again to retry.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Word Count", f"{stats['words']:,}")
+    col2.metric("Character Count", f"{stats['chars']:,}")
+    col3.metric("Lines", f"{stats['lines']:,}")
+    col4.metric("Unique Terms", f"{stats['unique_terms']:,}")
+    st.caption(
+        f"{stats['blank_lines']:,} blank lines; lines average {stats['mean_line']:.1f} "
+        f"characters, the longest has {stats['longest_line']:,}."
+    )
+
+    if stats['top_terms']:
+        top_n = st.slider("Top terms", min_value=5, max_value=TOP_TERMS, value=20, step=5)
+        st.dataframe(
+            [{'Term': term, 'Count': count} for term, count in stats['top_terms'][:top_n]],
+            use_container_width=True,
+        )
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_wave_path(digest, start_clli, _routes):
+    # Keyed by the parsed routes' hash and the start CLLI; the routes are not hashed again
+    return build_wave_path(_routes, start_clli)
 
-def detect_system_change(prev_segment, curr_segment):
-    """Detect if there's a system change between two segments."""
-    if not prev_segment or not curr_segment:
-        return False
-
-    # Check if geographical prefixes match but suffixes differ
-    for loc in ['loc1', 'loc2']:
-        prev_loc = prev_segment[loc]
-        curr_loc = curr_segment[loc]
-
-        if prev_loc['code'] == curr_loc['code'] and prev_loc['suffix'] != curr_loc['suffix']:
-            return True
-
-    return False
-
-def remove_duplicates(routes):
-    """Remove duplicate routes while preserving order."""
-    seen = set()
-    unique_routes = []
-
-    for route in routes:
-        # Create a unique key for the route based on facility ID
-        route_key = f"{route['seq_num']} {route['full_facility']}"
-        if route_key not in seen:
-            seen.add(route_key)
-            unique_routes.append(route)
-
-    return unique_routes
-
-def parse_wave_routes(input_data):
-    filtered_lines = []
-    for line in input_data.splitlines():
-        parts = line.split()
-        if len(parts) > 2:
-            facility_parts = [p for p in parts if p.startswith('/')]
-            if not facility_parts:
-                continue
-            facility = facility_parts[0]
-            if '/FIBER' in facility.upper() and not line.endswith('null null'):
-                try:
-                    number = parts[1]
-                    path_parts = facility.split('/')
-                    if len(path_parts) == 4:
-                        _, fiber_type, loc1, loc2 = path_parts
-                        filtered_lines.append(f"{number} {facility}")
-                except:
-                    continue
-    unique_lines = []
-    seen = set()
-    for line in filtered_lines:
-        if line not in seen:
-            unique_lines.append(line)
-            seen.add(line)
-    return unique_lines
-
-def build_wave_path(output1, start_loc):
-    # Helper functions remain the same
-    def get_clli(loc):
-        return loc[:8] if len(loc) >= 8 else loc
-
-    def get_suffix_type(loc):
-        if len(loc) > 8:
-            return loc[8:9]
-        return ''
-
-    # Parse all routes into a list of dicts, both directions
-    routes = []
-    # Store original unique routes for accurate counting
-    original_unique_routes = set(output1)  # This gives us the true count of input routes
-
-    for line in output1:
-        parts = line.split()
-        if len(parts) < 2:
-            continue
-        number = parts[0]
-        facility = parts[1]
-        path_parts = facility.split('/')
-        if len(path_parts) != 4:
-            continue
-        _, fiber_type, loc1, loc2 = path_parts
-        routes.append({
-            'number': number,
-            'fiber_type': fiber_type,
-            'loc1': loc1,
-            'loc2': loc2,
-            'line': line,
-            'loc1_clli': get_clli(loc1),
-            'loc2_clli': get_clli(loc2)
-        })
-        routes.append({
-            'number': number,
-            'fiber_type': fiber_type,
-            'loc1': loc2,
-            'loc2': loc1,
-            'line': line,
-            'loc1_clli': get_clli(loc2),
-            'loc2_clli': get_clli(loc1)
-        })
-
-    used_lines = set()
-    final_routes = []
-    system_changes = 0
-    original_routes_count = len(original_unique_routes)  # Use the actual count from input
-
-    # Rest of the function remains the same...
-    start_loc = get_clli(start_loc.strip().upper())
-    current_loc = None
-    prev_suffix = None
-
-    for route in routes:
-        if route['loc1_clli'] == start_loc:
-            final_routes.append(route['line'])
-            used_lines.add(route['line'])
-            current_loc = route['loc2_clli']
-            prev_suffix = get_suffix_type(route['loc1'])
-            break
-
-    if not final_routes:
-        return ["Error: Could not find starting location in parsed routes."], [], f"Original Routes: {original_routes_count} | Final Routes: 0 | System Changes: 0"
-
-    while True:
-        found = False
-        for route in routes:
-            if route['line'] in used_lines:
-                continue
-
-            if route['loc1_clli'] == current_loc:
-                curr_suffix = get_suffix_type(route['loc1'])
-                if prev_suffix and curr_suffix and prev_suffix != curr_suffix:
-                    final_routes.append('--- SYSTEM CHANGE ---')
-                    system_changes += 1
-
-                final_routes.append(route['line'])
-                used_lines.add(route['line'])
-                current_loc = route['loc2_clli']
-                prev_suffix = get_suffix_type(route['loc2'])
-                found = True
-                break
-
-        if not found:
-            break
-
-    final_routes_count = len([line for line in final_routes if not line.startswith('---')])
-    summary = f"Original Routes: {original_routes_count} | Final Routes: {final_routes_count} | System Changes: {system_changes}"
-    output3 = [line for line in output1]
-    return final_routes, output3, summary
-    
 def show_wave_route_parser():
     st.subheader("Wave Route Parser")
     st.markdown(
@@ -320,20 +256,20 @@ def show_wave_route_parser():
     if st.button("Parse", key="wave_parse"):
         routes = parse_wave_routes(input_data)
         st.session_state['parsed_routes'] = routes  # Store in session state
+        st.session_state['parsed_routes_digest'] = routes_digest(routes)
 
     # Only show parsed routes if they exist in session state
     if 'parsed_routes' in st.session_state and st.session_state['parsed_routes']:
         routes = st.session_state['parsed_routes']
         st.markdown("#### Parsed Routes (Duplicates Removed)")
-        for route in routes:
-            st.text(route)
+        st.text("\n".join(route.line for route in routes))
 
         start_loc = st.text_input("Enter starting location code (8 characters)", key="wave_start_loc")
         if start_loc:
-            path, changes, summary = build_wave_path(routes, start_loc)
+            start_clli = start_loc.strip().upper()[:8]
+            path, changes, summary = cached_wave_path(st.session_state['parsed_routes_digest'], start_clli, routes)
             st.markdown("#### Continuous Path with System Changes")
-            for line in path:
-                st.text(line)
+            st.text("\n".join(path))
             st.markdown("#### Summary")
             st.text(summary)
     elif 'parsed_routes' in st.session_state and not st.session_state['parsed_routes']:
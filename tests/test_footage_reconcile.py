@@ -0,0 +1,14 @@
+from worktools.footage_reconcile import match_placemarks
+
+
+def test_token_match_keeps_number_order():
+    matches, methods = match_placemarks(['CBL-1 (SEG 2)'], ['cbl 2 seg 1'])
+    assert matches == {'CBL-1 (SEG 2)': None}
+    assert methods == {'CBL-1 (SEG 2)': None}
+
+
+def test_swapped_numbers_do_not_steal_placemarks():
+    sheaths = ['CBL-1 (SEG 2)', 'CBL-2 (SEG 1)']
+    matches, methods = match_placemarks(sheaths, ['cbl 2 seg 1', 'CBL SEG 1-2'])
+    assert matches == {'CBL-1 (SEG 2)': 1, 'CBL-2 (SEG 1)': 0}
+    assert methods == {'CBL-1 (SEG 2)': 'tokens', 'CBL-2 (SEG 1)': 'exact'}
@@ -0,0 +1 @@
+"""Parsing logic shared by the Streamlit apps, the CLI and other services."""
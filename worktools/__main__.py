@@ -0,0 +1,5 @@
+import sys
+
+from worktools.cli import main
+
+sys.exit(main())
@@ -0,0 +1,310 @@
+"""Local HTTP API exposing the parsers on a bounded process pool.
+
+    python -m worktools.api_server --port 8765 --workers 4
+
+Endpoints (request body is the raw export, responses are JSON):
+
+    POST /wave[?start=CLLI]   ZDAF wave route dump; add &coverage=full for the Eulerian path
+    POST /fiber               IQGeo fiber sheath grid
+    POST /xlr                 XLR circuit record
+    POST /kmz[?name=file.kmz] KMZ or KML file, streamed (Content-Length or chunked)
+    POST /diff/{wave,fiber,kmz}?old_bytes=N
+                              two exports of one kind, the old one (its first N bytes) then
+                              the new one; returns the changed rows and a summary
+                              (KMZ names default from the content; set old_name/new_name)
+    GET  /metrics             per-endpoint latency, queue depth and worker usage
+    GET  /health
+
+Records have the same shape as the ``python -m worktools`` CLI output,
+including ``python -m worktools diff``.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from worktools.cli import COMMANDS
+from worktools.route_diff import DIFFS
+
+READ_CHUNK = 64 * 1024
+# Bodies above this size are spooled to disk and handed to workers by path
+SPOOL_THRESHOLD = 8 * 1024 * 1024
+
+
+def read_job_payload(payload):
+    if isinstance(payload, tuple):
+        with open(payload[1], 'rb') as fh:
+            return fh.read()
+    return payload
+
+
+def run_job(command, options, source, payload):
+    """Worker entry point: payload is the body bytes or a path to a spooled file."""
+    payload = read_job_payload(payload)
+    data = payload if command == 'kmz' else payload.decode('utf-8', errors='replace')
+    return {'records': list(COMMANDS[command](source, data, **options))}
+
+
+def run_diff(kind, old_bytes, names, payload):
+    """Worker entry point for /diff: the first old_bytes of the body are the old export."""
+    payload = read_job_payload(payload)
+    if old_bytes > len(payload):
+        raise ValueError(f'old_bytes is {old_bytes} but the body has {len(payload)} bytes')
+    old, new = payload[:old_bytes], payload[old_bytes:]
+    if kind == 'kmz':
+        # KMZ files are zip archives; anything else is read as KML
+        old = (names[0] or ('old.kmz' if old[:2] == b'PK' else 'old.kml'), old)
+        new = (names[1] or ('new.kmz' if new[:2] == b'PK' else 'new.kml'), new)
+    else:
+        old = old.decode('utf-8', errors='replace')
+        new = new.decode('utf-8', errors='replace')
+    return DIFFS[kind](old, new)
+
+
+def remove_spool(path, _future=None):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class EndpointStats:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.counts = {}
+        self.errors = {}
+        self.window = window
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            result = {}
+            for endpoint, samples in self.latencies.items():
+                ordered = sorted(samples)
+                result[endpoint] = {
+                    'requests': self.counts[endpoint],
+                    'errors': self.errors.get(endpoint, 0),
+                    'latency_ms': {
+                        'mean': 1000 * sum(ordered) / len(ordered),
+                        'p50': 1000 * ordered[len(ordered) // 2],
+                        'p95': 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                        'max': 1000 * ordered[-1],
+                    },
+                }
+            return result
+
+
+class ParserService:
+    """Owns the process pool and admits at most workers + max_queue jobs at once."""
+
+    def __init__(self, workers, max_queue, timeout):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.stats = EndpointStats()
+        self.lock = threading.Lock()
+        self.pending = 0
+
+    def submit(self, job, *args):
+        with self.lock:
+            if self.pending >= self.workers + self.max_queue:
+                return None
+            self.pending += 1
+        future = self.pool.submit(job, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self.lock:
+            self.pending -= 1
+
+    def metrics(self):
+        with self.lock:
+            pending = self.pending
+        return {
+            'workers': self.workers,
+            'in_flight': pending,
+            'queue_depth': max(0, pending - self.workers),
+            'max_queue': self.max_queue,
+            'endpoints': self.stats.snapshot(),
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class ParserRequestHandler(BaseHTTPRequestHandler):
+    service = None
+    max_body = 512 * 1024 * 1024
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        elif path == '/metrics':
+            self.send_json(200, self.service.metrics())
+        else:
+            self.send_json(404, {'error': f'unknown endpoint {path}'})
+
+    def iter_body(self):
+        """Yield the request body in chunks, for both Content-Length and chunked uploads."""
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            while True:
+                size = int(self.rfile.readline().split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    # Skip trailers up to the terminating blank line
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return
+                remaining = size
+                while remaining:
+                    chunk = self.rfile.read(min(READ_CHUNK, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get('Content-Length') or 0)
+            while remaining:
+                chunk = self.rfile.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def read_payload(self):
+        """Read the body into memory, spilling to a temp file once it gets large."""
+        chunks = []
+        size = 0
+        spool = None
+        path = None
+        try:
+            for chunk in self.iter_body():
+                size += len(chunk)
+                if size > self.max_body:
+                    raise ValueError(f'request body exceeds {self.max_body} bytes')
+                if spool is None and size > SPOOL_THRESHOLD:
+                    fd, path = tempfile.mkstemp(prefix='worktools-', suffix='.upload')
+                    spool = os.fdopen(fd, 'wb')
+                    spool.writelines(chunks)
+                    chunks = []
+                if spool:
+                    spool.write(chunk)
+                else:
+                    chunks.append(chunk)
+        except ValueError:
+            if spool:
+                spool.close()
+                os.unlink(path)
+            raise
+        if spool:
+            spool.close()
+            return ('file', path), path
+        return b''.join(chunks), None
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        command = url.path.strip('/')
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if command.startswith('diff/') and command[5:] in DIFFS:
+            try:
+                old_bytes = int(params['old_bytes'])
+                if old_bytes < 0:
+                    raise ValueError
+            except (KeyError, ValueError):
+                self.send_json(400, {'error': 'old_bytes must give the size of the old export'})
+                return
+            job = partial(run_diff, command[5:], old_bytes, (params.get('old_name'), params.get('new_name')))
+        elif command in COMMANDS:
+            options = {}
+            if command == 'wave':
+                options = {'start': params.get('start'), 'full_coverage': params.get('coverage') == 'full'}
+            job = partial(run_job, command, options, params.get('name', f'<{command}>'))
+        else:
+            self.send_json(404, {'error': f'unknown endpoint {url.path}'})
+            return
+
+        start = time.perf_counter()
+        spooled = None
+        ok = False
+        try:
+            try:
+                payload, spooled = self.read_payload()
+            except ValueError as e:
+                self.send_json(413, {'error': str(e)})
+                return
+            future = self.service.submit(job, payload)
+            if future is None:
+                self.send_json(503, {'error': 'worker queue is full, retry later'})
+                return
+            if spooled:
+                # A timed-out job may still be reading the file, so the job removes it when it ends
+                future.add_done_callback(partial(remove_spool, spooled))
+                spooled = None
+            try:
+                result = future.result(timeout=self.service.timeout)
+            except FutureTimeout:
+                future.cancel()
+                self.send_json(504, {'error': 'parse timed out'})
+                return
+            except Exception as e:
+                self.send_json(422, {'error': str(e)})
+                return
+            ok = True
+            self.send_json(200, result)
+        finally:
+            if spooled:
+                remove_spool(spooled)
+            self.service.stats.record(command, time.perf_counter() - start, ok)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='parser processes in the pool')
+    parser.add_argument('--max-queue', type=int, default=32,
+                        help='jobs allowed to wait for a worker before returning 503')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds before a parse returns 504')
+    args = parser.parse_args(argv)
+
+    service = ParserService(args.workers, args.max_queue, args.timeout)
+    ParserRequestHandler.service = service
+    server = ThreadingHTTPServer((args.host, args.port), ParserRequestHandler)
+    print(f"Serving parsers on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
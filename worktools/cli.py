@@ -0,0 +1,383 @@
+"""Headless command-line entry point for the Work Tools parsers.
+
+Reads exports from files or stdin and streams JSON lines (default) or CSV to
+stdout, one record at a time, without importing Streamlit:
+
+    python -m worktools wave route.txt --start ABCDEFGH
+    python -m worktools wave route.txt --start ABCDEFGH --full-coverage
+    cat dump.txt | python -m worktools wave
+    find exports -name '*.txt' | python -m worktools fiber --files-from - --jobs 8
+    python -m worktools fiber huge_export.txt --jobs 8     # one file, split at Sheath: lines
+    python -m worktools kmz design.kmz --format csv > lengths.csv
+    python -m worktools diff fiber old_grid.txt new_grid.txt --format csv
+    python -m worktools fiber exports/*.txt --xlsx footage.xlsx   # one sheet per export
+    python -m worktools csv readings.csv --format csv      # column statistics, any file size
+    python -m worktools text server.log --jobs 8           # word, line and term counts
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from worktools.fiber_sheath import base_cable_name, parse_fiber_sheaths, parse_fiber_sheaths_parallel
+from worktools.wave_routes import build_full_coverage_path, build_wave_path, iter_wave_routes, parse_wave_routes
+from worktools.xlr import XLR_FIELDS, parse_xlr_record
+
+COLUMNS = {
+    'wave': ['source', 'position', 'seq', 'facility', 'system_change', 'gap', 'connected'],
+    'fiber': ['source', 'sheath', 'cable', 'footage_ft', 'min_fibers_available'],
+    'xlr': ['source'] + XLR_FIELDS + ['a_street_address', 'z_street_address', 'facilities'],
+    'kmz': ['source', 'placemark', 'entered_ft', 'entered_mi', 'calculated_ft',
+            'calculated_mi', 'difference_ft', 'points'],
+}
+
+
+def wave_records(source, text, start=None, full_coverage=False):
+    """Yield parsed routes, or the ordered path when a start CLLI is given.
+
+    With full_coverage the path covers every route connected to the start;
+    records after a jump have gap set, and unreachable routes follow with
+    connected false.
+    """
+    lines = text.splitlines() if isinstance(text, str) else text
+    if not start:
+        for position, route in enumerate(iter_wave_routes(lines), start=1):
+            yield {'source': source, 'position': position, 'seq': route.number,
+                   'facility': route.facility, 'system_change': False}
+        return
+
+    routes = parse_wave_routes("\n".join(lines))
+    build_path = build_full_coverage_path if full_coverage else build_wave_path
+    path, unconnected, summary = build_path(routes, start)
+    if path and path[0].startswith("Error:"):
+        raise ValueError(f"{path[0]} ({summary})")
+    position = 0
+    system_change = gap = False
+    for line in path:
+        if line == '--- GAP ---':
+            gap = True
+            continue
+        if line.startswith('---'):
+            system_change = True
+            continue
+        position += 1
+        seq, facility = line.split(' ', 1)
+        record = {'source': source, 'position': position, 'seq': seq,
+                  'facility': facility, 'system_change': system_change}
+        if full_coverage:
+            record.update(gap=gap, connected=True)
+        yield record
+        system_change = gap = False
+    if full_coverage:
+        for route in unconnected:
+            yield {'source': source, 'position': None, 'seq': route.number, 'facility': route.facility,
+                   'system_change': False, 'gap': False, 'connected': False}
+
+
+def fiber_records(source, text, workers=1, **_):
+    """Yield one record per sheath; workers > 1 splits one large export across processes."""
+    if workers > 1:
+        result = parse_fiber_sheaths_parallel(text, workers)
+    else:
+        result = parse_fiber_sheaths(text)
+    low_avail = {}
+    for sheath, avail in result['sheath_fiber_avail']:
+        low_avail[sheath] = min(avail, low_avail.get(sheath, avail))
+    for sheath in result['unique_sheaths']:
+        yield {
+            'source': source,
+            'sheath': sheath,
+            'cable': base_cable_name(sheath),
+            'footage_ft': round(result['sheath_footage'][sheath], 2),
+            'min_fibers_available': low_avail.get(sheath),
+        }
+
+
+def xlr_records(source, text, **_):
+    record = parse_xlr_record(text)
+    row = {'source': source}
+    row.update(record['fields'])
+    row['a_street_address'] = record['address_a']
+    row['z_street_address'] = record['address_z']
+    row['facilities'] = record['facilities']
+    yield row
+
+
+def kmz_records(source, data, **_):
+    from worktools.kmz_lengths import process_kml, read_kml
+
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    filename = source
+    if not filename.lower().endswith(('.kmz', '.kml')):
+        # stdin and odd file names: KMZ files are zip archives
+        filename += '.kmz' if data[:2] == b'PK' else '.kml'
+    rows, _ = process_kml(read_kml(filename, data))
+    for row in rows:
+        yield dict(source=source, **row)
+
+
+COMMANDS = {
+    'wave': wave_records,
+    'fiber': fiber_records,
+    'xlr': xlr_records,
+    'kmz': kmz_records,
+}
+
+
+def read_source(command, path):
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if command == 'kmz':
+        return data
+    return data.decode('utf-8', errors='replace')
+
+
+def process_path(command, options, path):
+    """Parse one file completely; used by the worker processes."""
+    try:
+        return list(COMMANDS[command](path, read_source(command, path), **options)), None
+    except Exception as e:
+        return [], f"{path}: {e}"
+
+
+class RecordWriter:
+    def __init__(self, stream, fmt, columns):
+        self.stream = stream
+        self.fmt = fmt
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(stream, fieldnames=columns, extrasaction='ignore')
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv:
+            if isinstance(record.get('facilities'), list):
+                record = dict(record, facilities='; '.join(record['facilities']))
+            self.csv.writerow(record)
+        else:
+            self.stream.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+
+class XlsxRecordWriter:
+    """Write records to an Excel workbook with one sheet per source file."""
+
+    def __init__(self, path, columns):
+        from worktools.xlsx_export import WorkbookWriter
+
+        self.workbook = WorkbookWriter(path)
+        self.columns = columns
+        self.source = None
+
+    def write(self, record):
+        if self.workbook.worksheet is None or record['source'] != self.source:
+            self.source = record['source']
+            self.workbook.add_sheet(os.path.basename(self.source), self.columns)
+        self.workbook.write(record)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.workbook.close()
+
+
+def iter_paths(args):
+    yield from args.paths
+    if args.files_from:
+        fh = sys.stdin if args.files_from == '-' else open(args.files_from)
+        with fh:
+            for line in fh:
+                if line.strip():
+                    yield line.strip()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m worktools',
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+    helps = {
+        'wave': 'ZDAF wave route dumps',
+        'fiber': 'IQGeo fiber sheath propagation grids',
+        'xlr': 'XLR circuit records',
+        'kmz': 'KMZ/KML placemark length comparison',
+    }
+    for name, help_text in helps.items():
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument('paths', nargs='*', help="input files; '-' or none reads stdin")
+        cmd.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+        cmd.add_argument('--xlsx', metavar='FILE',
+                         help='write an Excel workbook with one sheet per input instead (needs xlsxwriter)')
+        cmd.add_argument('--files-from', metavar='FILE',
+                         help="read input paths, one per line, from FILE ('-' for stdin)")
+        cmd.add_argument('--jobs', type=int, default=1,
+                         help='parse files in this many worker processes')
+        if name == 'wave':
+            cmd.add_argument('--start', help='starting CLLI; emits the ordered path instead of parsed routes')
+            cmd.add_argument('--full-coverage', action='store_true',
+                             help='with --start, cover every route connected to the start (Eulerian path)')
+    diff = sub.add_parser('diff', help='added, removed and changed items between two exports')
+    diff.add_argument('kind', choices=['wave', 'fiber', 'kmz'])
+    diff.add_argument('old', help='earlier export')
+    diff.add_argument('new', help='later export')
+    diff.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    stats = sub.add_parser('csv', help='statistics of the numeric columns of a CSV, read in chunks')
+    stats.add_argument('path', help='CSV file')
+    stats.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    text = sub.add_parser('text', help='word, line and top term counts of a large text file, read in chunks')
+    text.add_argument('path', help='text file')
+    text.add_argument('--jobs', type=int, default=1, help='analyze chunks in this many worker processes')
+    text.add_argument('--top', type=int, default=20, help='number of top terms to list')
+    return parser
+
+
+def diff_main(args):
+    """Write one record per changed item; the counts go to stderr."""
+    from worktools.route_diff import DIFF_COLUMNS, DIFFS
+
+    try:
+        if args.kind == 'kmz':
+            old = (args.old, read_source('kmz', args.old))
+            new = (args.new, read_source('kmz', args.new))
+        else:
+            old = read_source(args.kind, args.old)
+            new = read_source(args.kind, args.new)
+        result = DIFFS[args.kind](old, new)
+    except Exception as e:
+        print(f"diff: {e}", file=sys.stderr)
+        return 1
+    writer = RecordWriter(sys.stdout, args.format, DIFF_COLUMNS[args.kind])
+    for row in result['rows']:
+        writer.write(row)
+    writer.flush()
+    print(json.dumps(result['summary']), file=sys.stderr)
+    return 0
+
+
+def csv_main(args):
+    """Write one record per numeric column; the row count and reader go to stderr."""
+    from worktools.csv_stats import STAT_ROWS, csv_summary
+
+    try:
+        with open(args.path, 'rb') as fh:
+            summary = csv_summary(fh)
+    except Exception as e:
+        print(f"csv: {e}", file=sys.stderr)
+        return 1
+    writer = RecordWriter(sys.stdout, args.format, ['column'] + STAT_ROWS)
+    for name, values in summary['stats'].items():
+        record = {'column': name}
+        # NaN is not valid JSON; empty and single-value columns leave it empty
+        record.update((stat, None if math.isnan(value) else float(value)) for stat, value in values.items())
+        writer.write(record)
+    writer.flush()
+    print(json.dumps({key: summary[key] for key in ('rows', 'engine', 'sampled')}), file=sys.stderr)
+    return 0
+
+
+def text_main(args):
+    """Write the text statistics as one JSON object."""
+    from worktools.text_stats import analyze_text
+
+    try:
+        with open(args.path, 'rb') as fh:
+            summary = analyze_text(fh, workers=args.jobs, top_n=args.top)
+    except Exception as e:
+        print(f"text: {e}", file=sys.stderr)
+        return 1
+    sys.stdout.write(json.dumps(summary) + '\n')
+    return 0
+
+
+def main(argv=None):
+    try:
+        return run_main(argv)
+    except BrokenPipeError:
+        # The reader went away (as with '| head'); point stdout at devnull so the
+        # interpreter's final flush does not fail too, and exit like SIGPIPE would
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 141
+
+
+def run_main(argv):
+    args = build_parser().parse_args(argv)
+    if args.command == 'diff':
+        return diff_main(args)
+    if args.command == 'csv':
+        return csv_main(args)
+    if args.command == 'text':
+        return text_main(args)
+    if args.xlsx:
+        writer = XlsxRecordWriter(args.xlsx, [c for c in COLUMNS[args.command] if c != 'source'])
+    else:
+        writer = RecordWriter(sys.stdout, args.format, COLUMNS[args.command])
+    try:
+        return run_command(args, writer)
+    finally:
+        writer.close()
+
+
+def run_command(args, writer):
+    records_for = COMMANDS[args.command]
+    options = {'start': args.start, 'full_coverage': args.full_coverage} if args.command == 'wave' else {}
+    # A single fiber export uses the workers itself instead of spreading files over them
+    single_input = not args.files_from and len(args.paths) <= 1
+    if args.command == 'fiber' and single_input and args.jobs > 1:
+        options = {'workers': args.jobs}
+    errors = 0
+
+    def emit(records):
+        for record in records:
+            writer.write(record)
+        writer.flush()
+
+    if not args.files_from and args.paths in ([], ['-']):
+        if args.command == 'kmz':
+            data = sys.stdin.buffer.read()
+        elif args.command == 'wave' and not args.start:
+            # Routes are independent lines, so stream them straight through
+            data = sys.stdin
+        else:
+            data = sys.stdin.read()
+        try:
+            emit(records_for('<stdin>', data, **options))
+        except Exception as e:
+            print(f"<stdin>: {e}", file=sys.stderr)
+            errors += 1
+        return 1 if errors else 0
+
+    process = partial(process_path, args.command, options)
+    if args.jobs > 1 and not single_input:
+        pool = ProcessPoolExecutor(max_workers=args.jobs)
+        results = pool.map(process, iter_paths(args), chunksize=8)
+    else:
+        pool = None
+        results = map(process, iter_paths(args))
+    try:
+        for records, error in results:
+            emit(records)
+            if error:
+                print(error, file=sys.stderr)
+                errors += 1
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
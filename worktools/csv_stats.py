@@ -0,0 +1,184 @@
+"""Bounded-memory preview and summary statistics for large CSV files.
+
+The preview reads only the first rows. Statistics are computed in one
+streaming pass: each chunk updates per-column running moments (count, mean,
+variance, min, max), which merge exactly, and a fixed-size uniform sample of
+values from which the quartiles are estimated. Memory therefore depends on
+the chunk size and the sample size, not on the file size. Quartiles are
+exact whenever a column has no more values than the sample holds.
+
+pyarrow's streaming CSV reader is used when it is installed; otherwise, or if
+it cannot read the file, pandas reads the file in chunks.
+"""
+import hashlib
+import math
+
+PREVIEW_ROWS = 5
+CHUNK_ROWS = 200_000
+SAMPLE_SIZE = 10_000
+STAT_ROWS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+def file_digest(fh, block_size=1 << 20):
+    """SHA-256 of a binary file object's contents, read in blocks; leaves it rewound."""
+    fh.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: fh.read(block_size), b''):
+        digest.update(block)
+    fh.seek(0)
+    return digest.hexdigest()
+
+
+def read_preview(fh, rows=PREVIEW_ROWS):
+    """The first rows of a CSV, without reading the rest of the file."""
+    import pandas as pd
+
+    fh.seek(0)
+    return pd.read_csv(fh, nrows=rows)
+
+
+class ColumnSummary:
+    """Mergeable running statistics and a uniform sample for one numeric column.
+
+    The sample keeps the values with the smallest random keys seen so far,
+    so merging two samples gives a uniform sample of both.
+    """
+
+    def __init__(self, sample_size=SAMPLE_SIZE, seed=0):
+        import numpy as np
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.sample_keys = np.empty(0)
+        self.sample_values = np.empty(0)
+
+    def update(self, values):
+        """Add a float array of non-missing values."""
+        if not len(values):
+            return
+        mean = float(values.mean())
+        self._merge_moments(len(values), mean, float(((values - mean) ** 2).sum()),
+                            float(values.min()), float(values.max()))
+        self._merge_sample(self.rng.random(len(values)), values)
+
+    def merge(self, other):
+        if other.count:
+            self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+            self._merge_sample(other.sample_keys, other.sample_values)
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum):
+        # Chan et al.'s pairwise update keeps the variance exact across chunks
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def _merge_sample(self, keys, values):
+        import numpy as np
+
+        keys = np.concatenate([self.sample_keys, keys])
+        values = np.concatenate([self.sample_values, values])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, values = keys[keep], values[keep]
+        self.sample_keys, self.sample_values = keys, values
+
+    def describe(self):
+        """Statistics in the order of pandas' DataFrame.describe()."""
+        import numpy as np
+
+        if not self.count:
+            return [0] + [math.nan] * (len(STAT_ROWS) - 1)
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+        quartiles = np.quantile(self.sample_values, [0.25, 0.5, 0.75])
+        return [self.count, self.mean, std, self.min, *map(float, quartiles), self.max]
+
+
+def _pandas_chunks(fh, chunk_rows):
+    import pandas as pd
+
+    fh.seek(0)
+    yield from pd.read_csv(fh, chunksize=chunk_rows)
+
+
+def _arrow_chunks(fh, chunk_rows):
+    import pyarrow.csv as pacsv
+
+    fh.seek(0)
+    # Blocks of about 64 MiB keep memory bounded and the batches large
+    reader = pacsv.open_csv(fh, read_options=pacsv.ReadOptions(block_size=64 << 20))
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _summarize(chunks, sample_size, progress):
+    from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+    summaries = {}
+    non_numeric = set()
+    columns = []
+    rows = 0
+    for chunk in chunks:
+        rows += len(chunk)
+        for name in chunk.columns:
+            if name not in summaries and name not in non_numeric:
+                columns.append(name)
+            if name in non_numeric:
+                continue
+            column = chunk[name]
+            # describe() skips text and booleans; a column with any text in any chunk is text
+            if is_bool_dtype(column) or not is_numeric_dtype(column):
+                non_numeric.add(name)
+                summaries.pop(name, None)
+                continue
+            summary = summaries.get(name)
+            if summary is None:
+                summary = summaries[name] = ColumnSummary(sample_size, seed=len(columns))
+            summary.update(column.dropna().to_numpy(dtype='float64'))
+        if progress:
+            progress(rows)
+    return rows, [name for name in columns if name in summaries], summaries
+
+
+def csv_summary(fh, chunk_rows=CHUNK_ROWS, sample_size=SAMPLE_SIZE, progress=None):
+    """describe()-style statistics for the numeric columns of a CSV, in one streaming pass.
+
+    Returns a dict with the statistics DataFrame, the row count, the reader
+    used and whether any quartile was estimated from a sample. progress, if
+    given, is called with the number of rows read so far.
+    """
+    import pandas as pd
+
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+
+    engine = 'pandas'
+    result = None
+    if pyarrow is not None:
+        try:
+            result = _summarize(_arrow_chunks(fh, chunk_rows), sample_size, progress)
+            engine = 'pyarrow'
+        except pyarrow.ArrowInvalid:
+            # Type inference only looks at the first block; start again with pandas
+            result = None
+    if result is None:
+        result = _summarize(_pandas_chunks(fh, chunk_rows), sample_size, progress)
+
+    rows, columns, summaries = result
+    stats = pd.DataFrame({name: summaries[name].describe() for name in columns}, index=STAT_ROWS)
+    return {
+        'stats': stats,
+        'rows': rows,
+        'engine': engine,
+        'sampled': any(summary.count > sample_size for summary in summaries.values()),
+    }
@@ -0,0 +1,169 @@
+"""Fiber sheath footage and availability parsing for IQGeo propagation grids.
+
+Footage and availability lines belong to the most recent ``Sheath:`` line, so
+the text is parsed as blocks that each start at a sheath line. Blocks parse
+independently and ``merge_sheath_blocks`` folds them back together in order,
+which lets callers reuse or parallelize block parsing without changing results.
+"""
+import os
+import re
+
+from worktools.instrumentation import stage
+from worktools.jobs import track_progress
+
+SHEATH_PATTERN = re.compile(r'Sheath:\s*([^\(]+(?:\([^)]+\))?)')
+FOOTAGE_PATTERN = re.compile(r'(\d+\.\d+)\s+FT')
+AVAIL_PATTERN = re.compile(r'Sheath Fibers Available\s*:\s*(\d+)')
+# A line break followed by a Sheath: line, where parallel parsing prefers to cut
+CHUNK_BOUNDARY = re.compile(r'\n(?=[ \t]*Sheath:)')
+# Below this many characters per worker a process pool costs more than it saves
+MIN_CHUNK_CHARS = 1 << 20
+
+def base_cable_name(sheath):
+    """Strip the trailing "(segment)" from a sheath name to get its cable."""
+    return re.sub(r'\s*\([^)]+\)$', '', sheath).strip()
+
+def split_sheath_blocks(lines):
+    """Yield lists of lines, starting a new block at every Sheath: line."""
+    block = []
+    for line in lines:
+        # The substring test is a cheap pre-filter for the regex
+        if block and 'Sheath:' in line and SHEATH_PATTERN.search(line):
+            yield block
+            block = []
+        block.append(line)
+    if block:
+        yield block
+
+def parse_sheath_block(block):
+    """Parse one block into (sheath, footages, low availability counts).
+
+    sheath is None for text before the first Sheath: line, whose footage
+    belongs to no sheath.
+    """
+    match = SHEATH_PATTERN.search(block[0])
+    sheath = match.group(1).strip() if match else None
+    if not sheath:
+        return sheath, [], []
+    return (sheath,) + scan_sheath_lines(block)
+
+def scan_sheath_lines(lines):
+    """Footages and low (<20) fiber availability counts found in lines, in order."""
+    footages = []
+    low_avail = []
+    for line in lines:
+        footage_match = FOOTAGE_PATTERN.search(line)
+        if footage_match:
+            footages.append(float(footage_match.group(1)))
+        avail_match = AVAIL_PATTERN.search(line)
+        if avail_match:
+            avail = int(avail_match.group(1))
+            if avail < 20:
+                low_avail.append(avail)
+    return footages, low_avail
+
+def merge_sheath_blocks(blocks):
+    """Fold parsed blocks, in input order, into the parser's result dict."""
+    unique_sheaths = []
+    seen_sheaths = set()
+    sheath_fiber_avail = []
+    cable_names = []
+    seen_cables = set()
+    sheath_footage = {}
+    total_footage = 0.0
+
+    for current_sheath, footages, low_avail in blocks:
+        if current_sheath is None:
+            continue
+        if current_sheath not in seen_sheaths:
+            unique_sheaths.append(current_sheath)
+            seen_sheaths.add(current_sheath)
+            sheath_footage[current_sheath] = 0.0
+        base_cable = base_cable_name(current_sheath)
+        if base_cable not in seen_cables:
+            cable_names.append(base_cable)
+            seen_cables.add(base_cable)
+        # Add footages one at a time so float totals match a line-by-line scan
+        for footage in footages:
+            sheath_footage[current_sheath] += footage
+            total_footage += footage
+        for avail in low_avail:
+            sheath_fiber_avail.append((current_sheath, avail))
+
+    total_miles = total_footage / 5280
+    total_km = total_footage * 0.0003048
+    estimated_optical_km = total_km * 1.13
+
+    return {
+        'total_footage': total_footage,
+        'total_miles': total_miles,
+        'total_km': total_km,
+        'estimated_optical_km': estimated_optical_km,
+        'cable_names': cable_names,
+        'unique_sheaths': unique_sheaths,
+        'sheath_footage': sheath_footage,
+        'sheath_fiber_avail': sheath_fiber_avail
+    }
+
+def parse_fiber_sheaths(data, progress=None):
+    """Total the footage per sheath and collect low fiber availability from IQGeo text."""
+    lines = data.splitlines()
+    with stage("fiber.scan_lines"):
+        blocks = [parse_sheath_block(block)
+                  for block in split_sheath_blocks(track_progress(lines, progress))]
+    with stage("fiber.merge"):
+        return merge_sheath_blocks(blocks)
+
+def split_sheath_chunks(data, count):
+    """Cut data into about count pieces, each starting at a Sheath: line where possible."""
+    cuts = [0]
+    for i in range(1, count):
+        target = len(data) * i // count
+        if target <= cuts[-1]:
+            continue
+        boundary = CHUNK_BOUNDARY.search(data, target)
+        if boundary is None:
+            break
+        if boundary.end() > cuts[-1]:
+            cuts.append(boundary.end())
+    cuts.append(len(data))
+    return [data[start:end] for start, end in zip(cuts, cuts[1:]) if end > start]
+
+def parse_sheath_chunk(text):
+    """Parse one chunk in a worker: (leading footages, leading low availability, blocks).
+
+    Lines before the chunk's first Sheath: line continue the previous chunk's
+    last sheath, so they are returned separately for the caller to stitch on.
+    """
+    blocks = list(split_sheath_blocks(text.splitlines()))
+    leading = ([], [])
+    if blocks and not SHEATH_PATTERN.search(blocks[0][0]):
+        leading = scan_sheath_lines(blocks.pop(0))
+    return leading + ([parse_sheath_block(block) for block in blocks],)
+
+def parse_fiber_sheaths_parallel(data, workers=None, progress=None):
+    """parse_fiber_sheaths on a process pool; returns exactly the same result.
+
+    Small inputs, or a single worker, are parsed sequentially.
+    """
+    workers = workers or os.cpu_count() or 1
+    count = min(workers, len(data) // MIN_CHUNK_CHARS)
+    if count < 2:
+        return parse_fiber_sheaths(data, progress)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with stage("fiber.split_chunks"):
+        chunks = split_sheath_chunks(data, count)
+    blocks = []
+    with stage("fiber.parse_chunks"), ProcessPoolExecutor(max_workers=count) as pool:
+        for done, (footages, low_avail, chunk_blocks) in enumerate(pool.map(parse_sheath_chunk, chunks), start=1):
+            # Stitch lines cut off from the previous chunk's last block back onto it
+            if blocks and blocks[-1][0] and (footages or low_avail):
+                sheath, previous_footages, previous_low = blocks[-1]
+                blocks[-1] = (sheath, previous_footages + footages, previous_low + low_avail)
+            blocks.extend(chunk_blocks)
+            if progress:
+                progress(done / len(chunks))
+    with stage("fiber.merge"):
+        return merge_sheath_blocks(blocks)
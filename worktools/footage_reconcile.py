@@ -0,0 +1,199 @@
+"""Match IQGeo sheath footage to KMZ placemark lengths.
+
+Sheath and placemark names are reduced to tokens (letters and numbers, with
+leading zeros dropped), so "CBL-00012 (SEG 3)" and "cbl 12 seg 3" compare
+equal. Matching looks names up in hash indexes, in three passes:
+
+1. exact: same token sequence
+2. tokens: same words in any order, with the numbers in the same order
+3. fuzzy: candidates sharing the most character trigrams, confirmed by a
+   similarity ratio. Trigrams that occur in many names (such as a common
+   cable prefix) are skipped, so each lookup touches a bounded number of
+   candidates instead of comparing every sheath with every placemark.
+   Cable and segment numbers must agree (one name may add trailing numbers
+   such as a fiber count), since near-identical numbers are different cables.
+
+Each placemark is matched to at most one sheath.
+"""
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+from worktools.fiber_sheath import base_cable_name, parse_fiber_sheaths
+from worktools.instrumentation import stage
+from worktools.kmz_lengths import process_kml, read_kml
+
+TOKEN_PATTERN = re.compile(r'[A-Z]+|\d+')
+FUZZY_MIN_RATIO = 0.8
+FUZZY_CANDIDATES = 5
+
+
+def name_tokens(name):
+    """Upper-case letter and number runs of a name, numbers without leading zeros."""
+    return tuple(str(int(token)) if token.isdigit() else token
+                 for token in TOKEN_PATTERN.findall(name.upper()))
+
+
+def numbers_compatible(tokens1, tokens2):
+    """True when one name's numbers start with all of the other's, in order."""
+    numbers1 = [token for token in tokens1 if token.isdigit()]
+    numbers2 = [token for token in tokens2 if token.isdigit()]
+    shorter = min(len(numbers1), len(numbers2))
+    return numbers1[:shorter] == numbers2[:shorter]
+
+
+def token_set_key(tokens):
+    """Words as a set, numbers in order: "SEG 2 CBL 1" is not cable 2, segment 1."""
+    return (frozenset(token for token in tokens if not token.isdigit()),
+            tuple(token for token in tokens if token.isdigit()))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def match_placemarks(sheath_names, placemark_names, min_ratio=FUZZY_MIN_RATIO):
+    """Map each sheath name to a placemark index, or None; returns (matches, methods)."""
+    placemark_tokens = [name_tokens(name) for name in placemark_names]
+    keys = ["-".join(tokens) for tokens in placemark_tokens]
+    exact = {}
+    token_sets = {}
+    for index, tokens in enumerate(placemark_tokens):
+        exact.setdefault(keys[index], []).append(index)
+        token_sets.setdefault(token_set_key(tokens), []).append(index)
+
+    claimed = bytearray(len(placemark_names))
+
+    def claim(candidates):
+        for index in candidates or ():
+            if not claimed[index]:
+                claimed[index] = 1
+                return index
+        return None
+
+    matches = {}
+    methods = {}
+    pending = []
+    with stage("footage.index_match"):
+        for sheath in sheath_names:
+            tokens = name_tokens(sheath)
+            index = claim(exact.get("-".join(tokens)))
+            method = 'exact'
+            if index is None:
+                index = claim(token_sets.get(token_set_key(tokens)))
+                method = 'tokens'
+            if index is None:
+                pending.append(sheath)
+                continue
+            matches[sheath] = index
+            methods[sheath] = method
+
+    with stage("footage.fuzzy_match"):
+        # Trigram index over the placemarks still unclaimed
+        postings = {}
+        for index, key in enumerate(keys):
+            if not claimed[index]:
+                for gram in trigrams(key):
+                    postings.setdefault(gram, []).append(index)
+        # Grams shared by many names say little about which one is meant
+        limit = max(50, int(len(placemark_names) ** 0.5))
+        for sheath in pending:
+            tokens = name_tokens(sheath)
+            key = "-".join(tokens)
+            shared = Counter()
+            for gram in trigrams(key):
+                posting = postings.get(gram, ())
+                if len(posting) <= limit:
+                    shared.update(posting)
+            best, best_ratio = None, min_ratio
+            for index, _ in shared.most_common(FUZZY_CANDIDATES):
+                if claimed[index] or not numbers_compatible(tokens, placemark_tokens[index]):
+                    continue
+                ratio = SequenceMatcher(None, key, keys[index]).ratio()
+                if ratio >= best_ratio:
+                    best, best_ratio = index, ratio
+            if best is not None:
+                claimed[best] = 1
+            matches[sheath] = best
+            methods[sheath] = 'fuzzy' if best is not None else None
+
+    return matches, methods
+
+
+def reconcile_footage(fiber_result, kmz_rows):
+    """Join parse_fiber_sheaths output with process_kml rows.
+
+    Returns per-sheath rows, per-cable totals and deltas, the placemarks no
+    sheath matched and overall totals. Deltas are sheath footage minus KMZ
+    calculated footage.
+    """
+    sheath_footage = fiber_result['sheath_footage']
+    sheaths = fiber_result['unique_sheaths']
+    matches, methods = match_placemarks(sheaths, [row['placemark'] for row in kmz_rows])
+
+    sheath_rows = []
+    cables = {}
+    for sheath in sheaths:
+        index = matches[sheath]
+        sheath_ft = sheath_footage[sheath]
+        kmz_ft = kmz_rows[index]['calculated_ft'] if index is not None else None
+        sheath_rows.append({
+            'sheath': sheath,
+            'placemark': kmz_rows[index]['placemark'] if index is not None else None,
+            'match': methods[sheath],
+            'sheath_ft': sheath_ft,
+            'kmz_ft': kmz_ft,
+            'delta_ft': sheath_ft - kmz_ft if kmz_ft is not None else None,
+        })
+        cable = cables.setdefault(base_cable_name(sheath), {
+            'cable': base_cable_name(sheath), 'sheaths': 0, 'matched': 0,
+            'sheath_ft': 0.0, 'matched_sheath_ft': 0.0, 'kmz_ft': 0.0,
+        })
+        cable['sheaths'] += 1
+        cable['sheath_ft'] += sheath_ft
+        if kmz_ft is not None:
+            cable['matched'] += 1
+            cable['matched_sheath_ft'] += sheath_ft
+            cable['kmz_ft'] += kmz_ft
+
+    cable_rows = []
+    for cable in cables.values():
+        # Compare only the sheaths that found a placemark, so a missing one is not a footage gap
+        cable['delta_ft'] = cable['matched_sheath_ft'] - cable['kmz_ft']
+        cable['delta_pct'] = cable['delta_ft'] / cable['kmz_ft'] * 100 if cable['kmz_ft'] else None
+        cable_rows.append(cable)
+
+    matched_indexes = {index for index in matches.values() if index is not None}
+    unmatched_placemarks = [row for index, row in enumerate(kmz_rows) if index not in matched_indexes]
+
+    matched_sheath_ft = sum(row['matched_sheath_ft'] for row in cable_rows)
+    matched_kmz_ft = sum(row['kmz_ft'] for row in cable_rows)
+    totals = {
+        'sheaths': len(sheaths),
+        'placemarks': len(kmz_rows),
+        'matched': len(matched_indexes),
+        'sheath_ft': fiber_result['total_footage'],
+        'kmz_ft': sum(row['calculated_ft'] for row in kmz_rows),
+        'matched_sheath_ft': matched_sheath_ft,
+        'matched_kmz_ft': matched_kmz_ft,
+        'delta_ft': matched_sheath_ft - matched_kmz_ft,
+    }
+    return {
+        'sheaths': sheath_rows,
+        'cables': cable_rows,
+        'unmatched_placemarks': unmatched_placemarks,
+        'totals': totals,
+    }
+
+
+def reconcile_footage_inputs(fiber_text, kmz_name, kmz_data, progress=None):
+    """Parse an IQGeo paste and a KMZ/KML upload, then reconcile them."""
+    fiber_result = parse_fiber_sheaths(fiber_text)
+    if progress:
+        progress(0.3)
+    kmz_rows, _ = process_kml(read_kml(kmz_name, kmz_data))
+    if progress:
+        progress(0.8)
+    with stage("footage.reconcile"):
+        return reconcile_footage(fiber_result, kmz_rows)
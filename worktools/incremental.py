@@ -0,0 +1,111 @@
+"""Incremental re-parsing of edited pastes.
+
+Operators often parse a dump, fix a few lines and parse it again. These
+parsers remember the per-line (wave) or per-block (sheath) results of the
+previous parse and only run the parsing logic for lines or blocks that are
+new or changed. Results are identical to ``parse_wave_routes`` and
+``parse_fiber_sheaths``.
+
+The parsers run in a thread of the server process, so for a large paste
+that is mostly new the process pool is faster; ``worth_reusing`` samples
+the paste against the cache to choose.
+"""
+import threading
+
+from worktools.fiber_sheath import (
+    MIN_CHUNK_CHARS, merge_sheath_blocks, parse_sheath_block, split_sheath_blocks,
+)
+from worktools.instrumentation import stage
+from worktools.jobs import track_progress
+from worktools.wave_routes import parse_wave_line
+
+# Pastes this large are split across processes by the non-incremental parsers
+LARGE_INPUT_CHARS = 2 * MIN_CHUNK_CHARS
+MIN_REUSE = 0.5
+SAMPLE_LINES = 1000
+
+
+def sample_lines(text, count=SAMPLE_LINES):
+    lines = text.splitlines()
+    return lines[::max(1, len(lines) // count)]
+
+
+def worth_reusing(parser, text):
+    """Whether parser should parse text: small pastes, or large ones mostly seen in the previous parse."""
+    return len(text) < LARGE_INPUT_CHARS or parser.cached_fraction(text) >= MIN_REUSE
+
+
+class IncrementalWaveParser:
+    """parse_wave_routes with a line-level cache of the previous parse."""
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.last_stats = {'units': 0, 'reparsed': 0}
+
+    def cached_fraction(self, text):
+        """Estimated share of text's lines the previous parse already holds."""
+        sample = sample_lines(text)
+        cache = self._cache
+        return sum(line in cache for line in sample) / len(sample) if sample else 0.0
+
+    def parse(self, input_data, progress=None):
+        with self._lock, stage("wave.incremental_parse"):
+            previous = self._cache
+            cache = {}
+            routes = []
+            seen = set()
+            shared = {}
+            reparsed = 0
+            lines = input_data.splitlines()
+            for line in track_progress(lines, progress, every=5000):
+                if line in cache:
+                    route = cache[line]
+                elif line in previous:
+                    route = cache[line] = previous[line]
+                else:
+                    route = cache[line] = parse_wave_line(line, shared)
+                    reparsed += 1
+                if route is not None and route not in seen:
+                    seen.add(route)
+                    routes.append(route)
+            # Only keep lines of the latest paste so memory tracks the input size
+            self._cache = cache
+            self.last_stats = {'units': len(lines), 'reparsed': reparsed}
+            return routes
+
+
+class IncrementalSheathParser:
+    """parse_fiber_sheaths with a block-level cache of the previous parse."""
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.last_stats = {'units': 0, 'reparsed': 0}
+
+    def cached_fraction(self, text):
+        """Estimated share of text's lines that fall in blocks of the previous parse."""
+        sample = sample_lines(text)
+        if not sample or not self._cache:
+            return 0.0
+        lines = {line for block in self._cache for line in block}
+        return sum(line in lines for line in sample) / len(sample)
+
+    def parse(self, data, progress=None):
+        with self._lock, stage("fiber.incremental_parse"):
+            previous = self._cache
+            cache = {}
+            parsed_blocks = []
+            reparsed = 0
+            for block in split_sheath_blocks(track_progress(data.splitlines(), progress, every=5000)):
+                key = tuple(block)
+                parsed = cache.get(key) or previous.get(key)
+                if parsed is None:
+                    parsed = parse_sheath_block(block)
+                    reparsed += 1
+                cache[key] = parsed
+                parsed_blocks.append(parsed)
+            self._cache = cache
+            self.last_stats = {'units': len(parsed_blocks), 'reparsed': reparsed}
+            with stage("fiber.merge"):
+                return merge_sheath_blocks(parsed_blocks)
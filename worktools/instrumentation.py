@@ -0,0 +1,100 @@
+"""Named-stage timing and memory instrumentation.
+
+Code marks interesting sections with ``stage(name)``. Stages are only
+measured inside an active ``collect()`` block, so instrumented code costs a
+context-variable lookup when nobody is listening.
+
+Memory is measured with tracemalloc, which traces the whole process. It is
+meant for worker processes that run one job at a time; the Streamlit server
+process collects timings only.
+"""
+import contextvars
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+METRICS_FILE = os.environ.get("WORKTOOLS_METRICS_FILE", "metrics.jsonl")
+
+_collector = contextvars.ContextVar("worktools_stage_collector", default=None)
+
+
+class _Collector:
+    def __init__(self, memory):
+        self.memory = memory
+        self.records = []
+        self.stack = []
+        self.started = time.perf_counter()
+
+
+@contextmanager
+def collect(memory=False, enabled=True):
+    """Collect stage records made in this context; yields the list they are appended to."""
+    if not enabled:
+        yield []
+        return
+    collector = _Collector(memory)
+    started_tracing = False
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    token = _collector.set(collector)
+    try:
+        yield collector.records
+    finally:
+        _collector.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name):
+    """Time (and with memory collection, measure peak allocation of) a named stage."""
+    collector = _collector.get()
+    if collector is None:
+        yield
+        return
+
+    frame = {'peak': 0}
+    if collector.memory:
+        base = tracemalloc.get_traced_memory()[0]
+        # Keep the enclosing stage's peak before resetting it for this one
+        if collector.stack:
+            parent = collector.stack[-1]
+            parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    collector.stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        collector.stack.pop()
+        record = {
+            'stage': name,
+            'start': start - collector.started,
+            'seconds': seconds,
+            'depth': len(collector.stack),
+        }
+        if collector.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame['peak'])
+            record['peak_kb'] = max(0, peak - base) / 1024
+            record['net_kb'] = (current - base) / 1024
+            if collector.stack:
+                parent = collector.stack[-1]
+                parent['peak'] = max(parent['peak'], peak)
+        collector.records.append(record)
+
+
+def append_metrics(scope, records, path=None):
+    """Append one interaction's stage records to the JSON-lines metrics file."""
+    if not records:
+        return
+    run_id = uuid.uuid4().hex[:12]
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(path or METRICS_FILE, "a", encoding="utf-8") as fh:
+        for record in records:
+            fh.write(json.dumps(dict(record, ts=timestamp, run=run_id, scope=scope)) + "\n")
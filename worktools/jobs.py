@@ -0,0 +1,162 @@
+"""Process-wide background job pool with progress reporting and cancellation.
+
+Parsers opt in to progress reporting by accepting a ``progress`` keyword and
+calling it with a fraction between 0 and 1. Inside a job that call also checks
+whether the job was cancelled and raises ``JobCancelled`` if so.
+"""
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+
+from worktools.instrumentation import collect, stage
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+
+def track_progress(items, progress, every=1000):
+    """Yield items from a sized sequence, reporting progress every few items."""
+    if progress is None:
+        yield from items
+        return
+    total = len(items) or 1
+    for i, item in enumerate(items):
+        if i % every == 0:
+            progress(i / total)
+        yield item
+    progress(1.0)
+
+
+class ProgressReporter:
+    """Picklable progress callback handed to a parser running in a worker process."""
+
+    def __init__(self, shared, job_id, min_interval=0.25):
+        self.shared = shared
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.last = 0.0
+
+    def __call__(self, fraction):
+        # Every call is a round trip to the manager process, so throttle them
+        now = time.monotonic()
+        if now - self.last < self.min_interval and fraction < 1.0:
+            return
+        self.last = now
+        if self.shared.get(('cancel', self.job_id)):
+            raise JobCancelled()
+        self.shared[self.job_id] = fraction
+
+
+def run_job(func, args, kwargs, reporter, instrument=False, memory=True):
+    """Worker entry point; returns the result and any stage records collected."""
+    with collect(memory=memory, enabled=instrument) as stages:
+        with stage(f"job.{func.__name__}"):
+            result = func(*args, progress=reporter, **kwargs)
+    return result, stages
+
+
+class JobManager:
+    """Runs CPU-bound parse jobs on a shared process pool."""
+
+    def __init__(self, max_workers=None, local_workers=4):
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        # Local jobs run on threads in this process, for work that needs in-memory state
+        self._threads = ThreadPoolExecutor(max_workers=local_workers, thread_name_prefix="worktools-job")
+        self._manager = multiprocessing.Manager()
+        self._shared = self._manager.dict()
+        self._local = {}
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, instrument=False, local=False, **kwargs):
+        """Queue func(*args, progress=..., **kwargs) and return its job id.
+
+        With instrument=True the worker collects stage timings (and, in a
+        worker process, memory), available from stages() once the job is done.
+        local=True runs the job on a thread in this process instead, so func
+        may be a bound method of an object holding state such as a cache.
+        """
+        with self._lock:
+            job_id = next(self._ids)
+        if local:
+            reporter = ProgressReporter(self._local, job_id, min_interval=0)
+            future = self._threads.submit(run_job, func, args, kwargs, reporter, instrument, False)
+        else:
+            reporter = ProgressReporter(self._shared, job_id)
+            future = self._pool.submit(run_job, func, args, kwargs, reporter, instrument)
+        with self._lock:
+            self._jobs[job_id] = {'future': future, 'submitted': time.monotonic(), 'local': local}
+        return job_id
+
+    def _progress_map(self, job_id):
+        job = self._jobs.get(job_id)
+        return self._local if job and job['local'] else self._shared
+
+    def status(self, job_id):
+        """Return the job state ('queued', 'running', 'done', 'failed' or 'cancelled') and progress."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {'state': 'unknown', 'progress': 0.0, 'error': None, 'elapsed': 0.0}
+        future = job['future']
+        progress = self._progress_map(job_id).get(job_id, 0.0)
+        error = None
+        if future.cancelled():
+            state = 'cancelled'
+        elif future.done():
+            exc = future.exception()
+            if isinstance(exc, JobCancelled):
+                state = 'cancelled'
+            elif exc is not None:
+                state = 'failed'
+                error = str(exc) or type(exc).__name__
+            else:
+                state = 'done'
+                progress = 1.0
+        elif future.running():
+            state = 'running'
+        else:
+            state = 'queued'
+        return {
+            'state': state,
+            'progress': progress,
+            'error': error,
+            'elapsed': time.monotonic() - job['submitted'],
+        }
+
+    def result(self, job_id):
+        try:
+            return self._jobs[job_id]['future'].result()[0]
+        except CancelledError:
+            raise JobCancelled()
+
+    def stages(self, job_id):
+        """Stage records collected by an instrumented job (empty otherwise)."""
+        try:
+            return self._jobs[job_id]['future'].result()[1]
+        except (CancelledError, JobCancelled):
+            return []
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or ask a running one to stop at its next progress report."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if not job['future'].cancel():
+            self._progress_map(job_id)[('cancel', job_id)] = True
+
+    def forget(self, job_id):
+        """Drop a finished job and its shared progress entries."""
+        progress = self._progress_map(job_id)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        progress.pop(job_id, None)
+        progress.pop(('cancel', job_id), None)
+
+    def shutdown(self):
+        self._pool.shutdown(cancel_futures=True)
+        self._threads.shutdown(cancel_futures=True)
+        self._manager.shutdown()
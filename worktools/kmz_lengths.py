@@ -0,0 +1,198 @@
+"""Placemark length extraction and geometry measurement for KMZ/KML files."""
+import re
+import math
+
+from worktools.instrumentation import stage
+from worktools.jobs import track_progress
+
+
+def haversine_ft(lon1, lat1, lon2, lat2):
+    r_ft = 20925524.9
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    c = 2 * math.asin(math.sqrt(a))
+    return r_ft * c
+
+
+def parse_coords(coord_text):
+    coords = []
+    if not coord_text:
+        return coords
+
+    for part in coord_text.strip().split():
+        pieces = part.split(",")
+        if len(pieces) >= 2:
+            try:
+                lon = float(pieces[0])
+                lat = float(pieces[1])
+                alt = float(pieces[2]) if len(pieces) > 2 else 0
+                coords.append((lon, lat, alt))
+            except ValueError:
+                pass
+
+    return coords
+
+
+def geometry_length_ft(coords):
+    total = 0
+    for i in range(len(coords) - 1):
+        lon1, lat1, _ = coords[i]
+        lon2, lat2, _ = coords[i + 1]
+        total += haversine_ft(lon1, lat1, lon2, lat2)
+    return total
+
+
+def extract_entered_distance(description):
+    if not description:
+        return None
+
+    text = re.sub(r"<[^>]+>", " ", description)
+    text = text.replace("&nbsp;", " ")
+
+    patterns = [
+        r"feet\s*[:=]+\s*([0-9,.]+)",
+        r"footage\s*[:=]+\s*([0-9,.]+)",
+        r"length\s*[:=]+\s*([0-9,.]+)\s*ft",
+        r"([0-9,.]+)\s*ft",
+        r"miles\s*[:=]+\s*([0-9,.]+)",
+        r"([0-9,.]+)\s*mi\b",
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, text, flags=re.IGNORECASE)
+        if match:
+            value = float(match.group(1).replace(",", ""))
+            if "mile" in pattern or r"\s*mi" in pattern:
+                return value * 5280
+            return value
+
+    return None
+
+
+def read_kml(filename, data):
+    """Return the KML document bytes from a .kmz or .kml file's contents."""
+    import zipfile
+    from io import BytesIO
+
+    filename = filename.lower()
+
+    if filename.endswith(".kmz"):
+        with zipfile.ZipFile(BytesIO(data), "r") as kmz:
+            kml_names = [name for name in kmz.namelist() if name.lower().endswith(".kml")]
+            if not kml_names:
+                raise ValueError("No KML file found inside KMZ.")
+            return kmz.read(kml_names[0])
+
+    if filename.endswith(".kml"):
+        return data
+
+    raise ValueError("Please upload a .kmz or .kml file.")
+
+
+def find_text(element, tag_name):
+    for child in element.iter():
+        if child.tag.endswith(tag_name):
+            return child.text
+    return None
+
+
+def find_placemarks(kml_bytes):
+    """Parse a KML document and return its Placemark elements in document order."""
+    # Heavy imports are deferred until a file is actually processed
+    import xml.etree.ElementTree as ET
+
+    with stage("kmz.parse_xml"):
+        root = ET.fromstring(kml_bytes)
+
+        placemarks = []
+        for elem in root.iter():
+            if elem.tag.endswith("Placemark"):
+                placemarks.append(elem)
+    return placemarks
+
+
+def placemark_fields(pm, index):
+    """Name (or "Placemark {index}"), description and parsed coordinates of a placemark."""
+    name = find_text(pm, "name") or f"Placemark {index}"
+    description = find_text(pm, "description") or ""
+
+    coord_text = None
+    for child in pm.iter():
+        if child.tag.endswith("coordinates"):
+            coord_text = child.text
+            break
+
+    return name, description, parse_coords(coord_text)
+
+
+def process_kml(kml_bytes, progress=None):
+    """Compare entered and calculated footage per placemark and build a cleaned KML."""
+    placemarks = find_placemarks(kml_bytes)
+
+    rows = []
+    cleaned_placemarks = []
+
+    with stage("kmz.placemarks"):
+        for index, pm in enumerate(track_progress(placemarks, progress, every=100), start=1):
+            name, description, coords = placemark_fields(pm, index)
+            calc_ft = geometry_length_ft(coords) if len(coords) > 1 else 0
+            entered_ft = extract_entered_distance(description)
+
+            rows.append({
+                "placemark": name,
+                "entered_ft": entered_ft,
+                "entered_mi": entered_ft / 5280 if entered_ft is not None else None,
+                "calculated_ft": calc_ft,
+                "calculated_mi": calc_ft / 5280,
+                "difference_ft": entered_ft - calc_ft if entered_ft is not None else None,
+                "points": len(coords),
+            })
+
+            if len(coords) > 1:
+                coord_lines = " ".join([f"{lon},{lat},{alt}" for lon, lat, alt in coords])
+                clean_desc = (
+                    f"Entered feet: {entered_ft if entered_ft is not None else 'Not found'}<br>"
+                    f"Calculated feet: {calc_ft:.3f}<br>"
+                    f"Calculated miles: {calc_ft / 5280:.6f}"
+                )
+
+                cleaned_placemarks.append(f"""
+    <Placemark>
+      <name>{name}</name>
+      <description><![CDATA[{clean_desc}]]></description>
+      <Style>
+        <LineStyle>
+          <width>4</width>
+        </LineStyle>
+      </Style>
+      <LineString>
+        <tessellate>1</tessellate>
+        <coordinates>{coord_lines}</coordinates>
+      </LineString>
+    </Placemark>
+""")
+
+    with stage("kmz.build_kml"):
+        clean_kml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+  <Document>
+    <name>Cleaned KMZ Length Routes</name>
+    {''.join(cleaned_placemarks)}
+  </Document>
+</kml>
+"""
+
+    return rows, clean_kml
+
+
+def make_kmz(kml_text):
+    import zipfile
+    from io import BytesIO
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as kmz:
+        kmz.writestr("doc.kml", kml_text)
+    buffer.seek(0)
+    return buffer.getvalue()
@@ -0,0 +1,172 @@
+"""Persistent research notes in SQLite with a full-text index.
+
+Notes live in one table keyed by an integer id, with an index on
+(owner, space, id) so a page of a space's notes, newest first, is an index
+range scan however many notes the space holds. A NoteStore only ever sees
+its owner's notes. An FTS5 table mirrors the note text (kept in step by
+triggers) and answers searches across the owner's spaces, ranked by bm25.
+SQLite builds without FTS5 fall back to a LIKE scan.
+
+The database file defaults to notes.db in the working directory; set
+WORKTOOLS_NOTES_DB to keep it elsewhere. WORKTOOLS_NOTES_OWNER names the
+owner used when the app has no signed-in user (default: empty, which is
+also the owner of notes written before owners existed).
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+NOTES_DB = os.environ.get("WORKTOOLS_NOTES_DB", "notes.db")
+NOTES_OWNER = os.environ.get("WORKTOOLS_NOTES_OWNER", "")
+PAGE_SIZE = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    space TEXT NOT NULL,
+    created TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+"""
+
+INDEX_SCHEMA = """
+DROP INDEX IF EXISTS notes_space;
+CREATE INDEX IF NOT EXISTS notes_owner_space ON notes (owner, space, id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(content, content='notes', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE OF content ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO notes_fts (rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+WORD_PATTERN = re.compile(r'\w+')
+LIKE_SPECIAL = re.compile(r'([\\%_])')
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must appear, the last one as a prefix."""
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def like_pattern(word):
+    """LIKE pattern for text containing word, with % and _ matched literally."""
+    return "%" + LIKE_SPECIAL.sub(r'\\\1', word) + "%"
+
+
+class NoteStore:
+    """One owner's notes, for any number of spaces, in one SQLite file.
+
+    The connection may be shared by the threads of a Streamlit server, so
+    every statement runs under a lock.
+    """
+
+    def __init__(self, path=None, owner=''):
+        self.path = path or NOTES_DB
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if self.path != ':memory:':
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            # Files written before notes had owners
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(notes)")]
+            if 'owner' not in columns:
+                self._conn.execute("ALTER TABLE notes ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+            self._conn.executescript(INDEX_SCHEMA)
+            try:
+                self._conn.executescript(FTS_SCHEMA)
+                self.full_text = True
+            except sqlite3.OperationalError:
+                # SQLite compiled without FTS5
+                self.full_text = False
+
+    def add(self, space, content, created=None):
+        """Store a note and return its id."""
+        created = created or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO notes (owner, space, created, content) VALUES (?, ?, ?, ?)",
+                (self.owner, space, created, content),
+            )
+        return cursor.lastrowid
+
+    def count(self, space):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM notes WHERE owner = ? AND space = ?", (self.owner, space),
+            ).fetchone()[0]
+
+    def page(self, space, page=0, page_size=PAGE_SIZE):
+        """One page of a space's notes, newest first, as dicts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, space, created, content FROM notes WHERE owner = ? AND space = ? "
+                "ORDER BY id DESC LIMIT ? OFFSET ?",
+                (self.owner, space, page_size, page * page_size),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _match(self, text, space):
+        """FROM/WHERE clause, arguments and ranking for a search, or None when text has no words."""
+        words = WORD_PATTERN.findall(text)
+        if not words:
+            return None
+        owner_filter = " AND notes.owner = ?" + (" AND notes.space = ?" if space is not None else "")
+        owner_args = (self.owner,) + ((space,) if space is not None else ())
+        if self.full_text:
+            clause = "notes_fts JOIN notes ON notes.id = notes_fts.rowid WHERE notes_fts MATCH ?" + owner_filter
+            return clause, (fts_query(text),) + owner_args, "bm25(notes_fts)"
+        # \w+ words can contain _, which LIKE would treat as a wildcard
+        clause = "notes WHERE " + " AND ".join("notes.content LIKE ? ESCAPE '\\'" for _ in words) + owner_filter
+        return clause, tuple(like_pattern(word) for word in words) + owner_args, "notes.id DESC"
+
+    def search_count(self, text, space=None):
+        match = self._match(text, space)
+        if match is None:
+            return 0
+        clause, args, _ = match
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {clause}", args).fetchone()[0]
+
+    def search(self, text, space=None, limit=PAGE_SIZE, offset=0):
+        """Notes containing every word of text (the last as a prefix), best first.
+
+        With full-text search each row has a 'snippet' with the matches in
+        bold. space limits the search to one of the owner's spaces.
+        """
+        match = self._match(text, space)
+        if match is None:
+            return []
+        clause, args, order = match
+        columns = "notes.id, notes.space, notes.created, notes.content"
+        if self.full_text:
+            columns += ", snippet(notes_fts, 0, '**', '**', '...', 16) AS snippet"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                args + (limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,118 @@
+"""Cross-reference XLR network facilities against ZDAF wave route facilities.
+
+Both sides are reduced to a facility key: the two CLLI codes in sorted order,
+plus a normalized fiber type with match_type. Wave dumps only hold FIBER
+facilities while XLRs usually list the rate riding them (such as 100G), so
+types are only compared on request. The wave side is indexed by key and every XLR
+facility is looked up once, so a circuit reconciles in linear time however
+long its route is. Facilities found on only one side are reported as
+missing. Matched facilities that the XLR lists in a different order from the
+wave route are reported as out of order.
+"""
+from bisect import bisect_left
+
+from worktools.instrumentation import stage
+from worktools.jobs import track_progress
+from worktools.wave_routes import parse_wave_routes
+from worktools.xlr import format_facility, xlr_facility_matches
+
+
+def normalize_type(fiber_type):
+    """FIBERL, FIBERM and FIBER all compare as FIBER; rates such as 100G are kept as is."""
+    fiber_type = fiber_type.upper()
+    return 'FIBER' if 'FIBER' in fiber_type else fiber_type
+
+
+def facility_key(fiber_type, loc1, loc2, match_type=False):
+    """Direction-independent key for a facility between two locations."""
+    clli1, clli2 = sorted((loc1[:8].upper(), loc2[:8].upper()))
+    if not match_type:
+        return (clli1, clli2)
+    return (clli1, clli2, normalize_type(fiber_type))
+
+
+def out_of_order(positions):
+    """Indexes of positions outside one longest increasing run, i.e. the ones to move.
+
+    Patience sorting, O(n log n).
+    """
+    tails = []
+    tail_index = []
+    previous = [-1] * len(positions)
+    for i, position in enumerate(positions):
+        j = bisect_left(tails, position)
+        if j == len(tails):
+            tails.append(position)
+            tail_index.append(i)
+        else:
+            tails[j] = position
+            tail_index[j] = i
+        previous[i] = tail_index[j - 1] if j else -1
+    keep = set()
+    i = tail_index[-1] if tail_index else -1
+    while i >= 0:
+        keep.add(i)
+        i = previous[i]
+    return [i for i in range(len(positions)) if i not in keep]
+
+
+def reconcile(xlr_text, wave_text, match_type=False):
+    """Reconcile one circuit's XLR text against its wave route dump."""
+    with stage("reconcile.index"):
+        routes = parse_wave_routes(wave_text)
+        # Parallel facilities share a key, so each key keeps its wave positions in order
+        wave_index = {}
+        for position, route in enumerate(routes):
+            key = facility_key(route.fiber_type, route.loc1, route.loc2, match_type)
+            wave_index.setdefault(key, []).append(position)
+
+    with stage("reconcile.join"):
+        matched_wave = bytearray(len(routes))
+        cursors = {}
+        xlr_facilities = []
+        missing_from_wave = []
+        matches = []
+        for m in xlr_facility_matches(xlr_text):
+            facility = format_facility(m)
+            xlr_facilities.append(facility)
+            key = facility_key(m.group(2), m.group(3), m.group(4), match_type)
+            positions = wave_index.get(key, ())
+            cursor = cursors.get(key, 0)
+            if cursor < len(positions):
+                cursors[key] = cursor + 1
+                matched_wave[positions[cursor]] = 1
+                matches.append((facility, positions[cursor]))
+            else:
+                missing_from_wave.append(facility)
+        missing_from_xlr = [route.line for position, route in enumerate(routes) if not matched_wave[position]]
+        moved = out_of_order([position for _, position in matches])
+
+    return {
+        'xlr_facilities': len(xlr_facilities),
+        'wave_facilities': len(routes),
+        'matched': len(matches),
+        'missing_from_wave': missing_from_wave,
+        'missing_from_xlr': missing_from_xlr,
+        'out_of_order': [(matches[i][0], routes[matches[i][1]].line) for i in moved],
+    }
+
+
+def reconcile_circuits(circuits, match_type=False, progress=None):
+    """Reconcile many (name, xlr_text, wave_text) circuits; returns (name, result) pairs."""
+    return [
+        (name, reconcile(xlr_text, wave_text, match_type))
+        for name, xlr_text, wave_text in track_progress(circuits, progress, every=1)
+    ]
+
+
+def issue_rows(results):
+    """Flatten reconcile_circuits results into one row per discrepancy."""
+    rows = []
+    for name, result in results:
+        for facility in result['missing_from_wave']:
+            rows.append({'Circuit': name, 'Issue': 'Missing from wave', 'XLR facility': facility, 'Wave route': ''})
+        for route in result['missing_from_xlr']:
+            rows.append({'Circuit': name, 'Issue': 'Missing from XLR', 'XLR facility': '', 'Wave route': route})
+        for facility, route in result['out_of_order']:
+            rows.append({'Circuit': name, 'Issue': 'Out of order', 'XLR facility': facility, 'Wave route': route})
+    return rows
@@ -0,0 +1,223 @@
+"""Diff two exports of the same route: wave dumps, sheath grids or KMZ designs.
+
+Each export is reduced to records with a key (what the item is) and a
+digest (what it looks like):
+
+- wave: key is the pair of locations in sorted order, digest the facility
+  number, fiber type and direction
+- fiber: key is the sheath name, digest its footage (to 0.01 FT) and the low
+  fiber availability counts
+- kmz: key is the placemark name, digest a hash of the coordinates (to 1e-7
+  degrees, altitude ignored) and the entered footage
+
+Records are matched with hash tables, so a diff is linear in the size of the
+two exports. Records with the same key and digest on both sides are
+unchanged, records left over with the same key are paired (in order) as
+changed, and the rest are added or removed. Repeated keys, such as parallel
+facilities between two locations, are matched one for one.
+"""
+import hashlib
+
+from worktools.fiber_sheath import parse_fiber_sheaths
+from worktools.instrumentation import stage
+from worktools.kmz_lengths import (
+    extract_entered_distance, find_placemarks, geometry_length_ft, placemark_fields, read_kml,
+)
+from worktools.wave_routes import iter_wave_routes
+
+DIFF_COLUMNS = {
+    'wave': ['change', 'locations', 'old', 'new'],
+    'fiber': ['change', 'sheath', 'old_ft', 'new_ft', 'delta_ft', 'old_min_fibers', 'new_min_fibers'],
+    'kmz': ['change', 'placemark', 'old_ft', 'new_ft', 'delta_ft', 'geometry_changed',
+            'old_entered_ft', 'new_entered_ft', 'old_points', 'new_points'],
+}
+
+
+def match_records(old, new):
+    """Match two lists of (key, digest, item) records.
+
+    Returns (unchanged count, changed (old item, new item) pairs, removed
+    old items, added new items); changed and removed follow the old order,
+    added the new order.
+    """
+    exact = {}
+    for index, (key, digest, _) in enumerate(new):
+        exact.setdefault((key, digest), []).append(index)
+    used = bytearray(len(new))
+    cursors = {}
+    unchanged = 0
+    leftover = []
+    for record in old:
+        pair = record[:2]
+        indexes = exact.get(pair, ())
+        cursor = cursors.get(pair, 0)
+        if cursor < len(indexes):
+            cursors[pair] = cursor + 1
+            used[indexes[cursor]] = 1
+            unchanged += 1
+        else:
+            leftover.append(record)
+
+    by_key = {}
+    for index, (key, _, item) in enumerate(new):
+        if not used[index]:
+            by_key.setdefault(key, []).append(index)
+    key_cursors = {}
+    changed = []
+    removed = []
+    for key, _, item in leftover:
+        indexes = by_key.get(key, ())
+        cursor = key_cursors.get(key, 0)
+        if cursor < len(indexes):
+            key_cursors[key] = cursor + 1
+            used[indexes[cursor]] = 1
+            changed.append((item, new[indexes[cursor]][2]))
+        else:
+            removed.append(item)
+    added = [item for index, (_, _, item) in enumerate(new) if not used[index]]
+    return unchanged, changed, removed, added
+
+
+def _diff(old, new, row, progress=None):
+    """Rows and counts for two record lists; row(change, old item, new item) builds a row."""
+    with stage("diff.match"):
+        unchanged, changed, removed, added = match_records(old, new)
+        rows = [row('removed', item, None) for item in removed]
+        rows.extend(row('changed', old_item, new_item) for old_item, new_item in changed)
+        rows.extend(row('added', None, item) for item in added)
+    if progress:
+        progress(1.0)
+    summary = {
+        'old': len(old),
+        'new': len(new),
+        'unchanged': unchanged,
+        'changed': len(changed),
+        'removed': len(removed),
+        'added': len(added),
+    }
+    return {'rows': rows, 'summary': summary}
+
+
+def wave_records(text):
+    records = []
+    for route in iter_wave_routes(text.splitlines()):
+        forward = route.loc1 <= route.loc2
+        key = (route.loc1, route.loc2) if forward else (route.loc2, route.loc1)
+        records.append((key, (route.number, route.fiber_type, forward), route))
+    return records
+
+
+def diff_wave_routes(old_text, new_text, progress=None):
+    """Facilities added, removed or changed (renumbered, retyped or reversed) between two ZDAF dumps."""
+    with stage("diff.parse"):
+        old = wave_records(old_text)
+        new = wave_records(new_text)
+
+    def row(change, old_route, new_route):
+        route = old_route or new_route
+        return {
+            'change': change,
+            'locations': '/'.join(sorted((route.loc1, route.loc2))),
+            'old': old_route.line if old_route else None,
+            'new': new_route.line if new_route else None,
+        }
+
+    return _diff(old, new, row, progress)
+
+
+def sheath_records(text):
+    result = parse_fiber_sheaths(text)
+    low = {}
+    for sheath, avail in result['sheath_fiber_avail']:
+        low.setdefault(sheath, []).append(avail)
+    records = []
+    for sheath in result['unique_sheaths']:
+        footage = result['sheath_footage'][sheath]
+        avail = tuple(low.get(sheath, ()))
+        records.append((sheath, (round(footage, 2), avail), (sheath, footage, min(avail, default=None))))
+    return records, result['total_footage']
+
+
+def diff_fiber_sheaths(old_text, new_text, progress=None):
+    """Sheaths added, removed or changed between two IQGeo grids, with footage deltas."""
+    with stage("diff.parse"):
+        old, old_total = sheath_records(old_text)
+        if progress:
+            progress(0.4)
+        new, new_total = sheath_records(new_text)
+        if progress:
+            progress(0.8)
+
+    def row(change, old_sheath, new_sheath):
+        old_ft = old_sheath[1] if old_sheath else None
+        new_ft = new_sheath[1] if new_sheath else None
+        return {
+            'change': change,
+            'sheath': (old_sheath or new_sheath)[0],
+            'old_ft': old_ft,
+            'new_ft': new_ft,
+            'delta_ft': (new_ft or 0.0) - (old_ft or 0.0),
+            'old_min_fibers': old_sheath[2] if old_sheath else None,
+            'new_min_fibers': new_sheath[2] if new_sheath else None,
+        }
+
+    result = _diff(old, new, row, progress)
+    result['summary'].update(old_ft=old_total, new_ft=new_total, delta_ft=new_total - old_total)
+    return result
+
+
+def geometry_digest(coords):
+    """Short hash of a placemark's longitude/latitude sequence."""
+    text = ';'.join(f"{lon:.7f},{lat:.7f}" for lon, lat, _ in coords)
+    return hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+
+
+def placemark_records(filename, data):
+    records = []
+    for index, pm in enumerate(find_placemarks(read_kml(filename, data)), start=1):
+        name, description, coords = placemark_fields(pm, index)
+        entered_ft = extract_entered_distance(description)
+        calc_ft = geometry_length_ft(coords) if len(coords) > 1 else 0
+        geometry = geometry_digest(coords)
+        records.append((name, (geometry, entered_ft), (name, calc_ft, geometry, entered_ft, len(coords))))
+    return records
+
+
+def diff_placemarks(old, new, progress=None):
+    """Placemarks added, removed or changed between two KMZ/KML files, each given as (filename, data)."""
+    with stage("diff.parse"):
+        old = placemark_records(*old)
+        if progress:
+            progress(0.4)
+        new = placemark_records(*new)
+        if progress:
+            progress(0.8)
+
+    def row(change, old_pm, new_pm):
+        old_ft = old_pm[1] if old_pm else None
+        new_ft = new_pm[1] if new_pm else None
+        return {
+            'change': change,
+            'placemark': (old_pm or new_pm)[0],
+            'old_ft': old_ft,
+            'new_ft': new_ft,
+            'delta_ft': (new_ft or 0.0) - (old_ft or 0.0),
+            'geometry_changed': old_pm[2] != new_pm[2] if old_pm and new_pm else None,
+            'old_entered_ft': old_pm[3] if old_pm else None,
+            'new_entered_ft': new_pm[3] if new_pm else None,
+            'old_points': old_pm[4] if old_pm else None,
+            'new_points': new_pm[4] if new_pm else None,
+        }
+
+    result = _diff(old, new, row, progress)
+    old_total = sum(record[2][1] for record in old)
+    new_total = sum(record[2][1] for record in new)
+    result['summary'].update(old_ft=old_total, new_ft=new_total, delta_ft=new_total - old_total)
+    return result
+
+
+DIFFS = {
+    'wave': diff_wave_routes,
+    'fiber': diff_fiber_sheaths,
+    'kmz': diff_placemarks,
+}
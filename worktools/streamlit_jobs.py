@@ -0,0 +1,104 @@
+"""Streamlit glue for running parse jobs on the shared background pool.
+
+Jobs are tracked per session in ``st.session_state.jobs``; the pool itself is
+shared by every session through ``st.cache_resource``.
+"""
+import os
+
+import streamlit as st
+
+from worktools.jobs import JobCancelled, JobManager
+from worktools.streamlit_perf import profiling_enabled, record_stages
+
+
+@st.cache_resource
+def get_job_manager():
+    return JobManager(max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)))
+
+
+def start_job(tool, kind, label, func, *args, context=None, local=False, **kwargs):
+    """Submit func to the shared pool (or a local thread) and remember it for this session."""
+    job_id = get_job_manager().submit(func, *args, instrument=profiling_enabled(), local=local, **kwargs)
+    st.session_state.setdefault('jobs', []).append({
+        'id': job_id,
+        'tool': tool,
+        'kind': kind,
+        'label': label,
+        'context': context or {},
+    })
+    return job_id
+
+
+def session_jobs(tool):
+    return [job for job in st.session_state.get('jobs', []) if job['tool'] == tool]
+
+
+def _drop(job):
+    get_job_manager().forget(job['id'])
+    st.session_state.jobs = [j for j in st.session_state.jobs if j['id'] != job['id']]
+
+
+def job_panel_active(tool):
+    """Whether the last full run rendered the job panel for this tool."""
+    return st.session_state.get(f"job_panel_{tool}", False)
+
+
+def show_job_panel(tool, on_complete, render_new_results, on_failed=None):
+    """Render the polling job panel for a tool if this session has jobs for it.
+
+    on_complete(job, result) stores a finished result and returns True when the
+    page needs a full rerun to show it; otherwise render_new_results() draws
+    results added since the last full run inside the panel. on_failed(job,
+    error), if given, is called when a failed job is dismissed, so the page
+    can keep showing the error once the job is gone.
+    """
+    active = bool(session_jobs(tool))
+    st.session_state[f"job_panel_{tool}"] = active
+    if active:
+        job_panel(tool, on_complete, render_new_results, on_failed)
+
+
+def rerun_after_submit(tool):
+    """Rerun just the calling fragment if the job panel is already polling, else the app."""
+    st.rerun(scope="fragment" if job_panel_active(tool) else "app")
+
+
+@st.fragment(run_every=1.0)
+def job_panel(tool, on_complete, render_new_results, on_failed=None):
+    manager = get_job_manager()
+    needs_full_rerun = False
+    for job in session_jobs(tool):
+        status = manager.status(job['id'])
+        state = status['state']
+        if state == 'done':
+            try:
+                needs_full_rerun |= bool(on_complete(job, manager.result(job['id'])))
+            except JobCancelled:
+                pass
+            record_stages(f"{tool}: {job['label']}", manager.stages(job['id']))
+            _drop(job)
+        elif state in ('cancelled', 'unknown'):
+            _drop(job)
+
+    if needs_full_rerun:
+        st.rerun()
+
+    if render_new_results:
+        render_new_results()
+
+    for job in session_jobs(tool):
+        status = manager.status(job['id'])
+        state = status['state']
+        if state == 'failed':
+            st.error(f"{job['label']} failed: {status['error']}")
+            if st.button("Dismiss", key=f"job_dismiss_{job['id']}"):
+                if on_failed:
+                    on_failed(job, status['error'])
+                _drop(job)
+                st.rerun(scope="fragment")
+        elif state in ('queued', 'running'):
+            col1, col2 = st.columns([5, 1])
+            text = f"{job['label']} ({state}, {status['elapsed']:.0f}s)"
+            col1.progress(min(max(status['progress'], 0.0), 1.0), text=text)
+            if col2.button("Cancel", key=f"job_cancel_{job['id']}"):
+                manager.cancel(job['id'])
@@ -0,0 +1,74 @@
+"""Streamlit side of the instrumentation: run timings, the sidebar panel and metrics logging."""
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from worktools.instrumentation import METRICS_FILE, append_metrics, collect
+
+
+def profiling_enabled():
+    return st.session_state.get("perf_panel", False)
+
+
+def record_stages(scope, stages):
+    """Keep an interaction's stage records for the panel and append them to the metrics file."""
+    if not stages:
+        return
+    recent = st.session_state.setdefault("perf_recent", [])
+    recent.append((scope, stages))
+    del recent[:-10]
+    append_metrics(scope, stages)
+
+
+@contextmanager
+def timed_run(scope):
+    """Record how long a full script run or a fragment rerun took, and its stages when profiling."""
+    profiling = profiling_enabled()
+    start = time.perf_counter()
+    # Timings only: tracemalloc would trace every session sharing this server process
+    with collect(enabled=profiling) as stages:
+        try:
+            yield
+        finally:
+            timings = st.session_state.setdefault("run_timings", [])
+            timings.append((scope, time.perf_counter() - start))
+            # Only the most recent interactions are interesting
+            del timings[:-20]
+            if profiling:
+                record_stages(scope, stages)
+
+
+def show_perf_panel():
+    """Sidebar toggle plus the recent interaction timings and per-stage breakdowns."""
+    st.sidebar.checkbox("Performance panel", key="perf_panel",
+                        help=f"Time every named stage and append the results to {METRICS_FILE}")
+
+    with st.sidebar.expander("Interaction timings"):
+        timings = st.session_state.get("run_timings", [])
+        if not timings:
+            st.caption("No interactions recorded yet.")
+        for scope, seconds in reversed(timings):
+            st.text(f"{scope}: {seconds * 1000:.1f} ms")
+
+    if not profiling_enabled():
+        return
+    with st.sidebar.expander("Stage breakdown", expanded=True):
+        recent = st.session_state.get("perf_recent", [])
+        if not recent:
+            st.caption("Interact with a tool to record stages.")
+        for scope, stages in reversed(recent):
+            st.markdown(f"**{scope}**")
+            st.dataframe(
+                [
+                    {
+                        'stage': '  ' * record['depth'] + record['stage'],
+                        'ms': round(record['seconds'] * 1000, 2),
+                        'peak KB': round(record['peak_kb'], 1) if 'peak_kb' in record else None,
+                    }
+                    for record in sorted(stages, key=lambda r: r['start'])
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
+        st.caption(f"Appending to {METRICS_FILE}")
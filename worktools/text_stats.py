@@ -0,0 +1,135 @@
+"""Word, term and line statistics for large text files, in chunks.
+
+The input is read in blocks of about CHUNK_BYTES, each extended to the end
+of its last line so no line or UTF-8 character is split. Every chunk is
+summarized into a TextStats, and TextStats merge by adding counts and
+Counters, so the chunks can be processed in any order on a process pool and
+only a few chunks are ever in memory at once.
+
+Words are whitespace-separated, as with str.split(). Terms are lower-cased
+runs of letters, so the top terms of a log are not swamped by numbers and
+timestamps.
+"""
+import heapq
+import io
+import os
+import re
+from collections import Counter
+
+CHUNK_BYTES = 8 << 20
+MIN_PARALLEL_BYTES = 32 << 20
+TOP_TERMS = 100
+TERM_PATTERN = re.compile(r'[^\W\d_]+')
+
+
+class TextStats:
+    """Mergeable counts for some whole lines of text."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.chars = 0
+        self.words = 0
+        self.lines = 0
+        self.blank_lines = 0
+        self.line_chars = 0
+        self.longest_line = 0
+        self.terms = Counter()
+
+    def merge(self, other):
+        self.bytes += other.bytes
+        self.chars += other.chars
+        self.words += other.words
+        self.lines += other.lines
+        self.blank_lines += other.blank_lines
+        self.line_chars += other.line_chars
+        self.longest_line = max(self.longest_line, other.longest_line)
+        self.terms.update(other.terms)
+        return self
+
+    def summary(self, top_n=TOP_TERMS):
+        return {
+            'bytes': self.bytes,
+            'chars': self.chars,
+            'words': self.words,
+            'lines': self.lines,
+            'blank_lines': self.blank_lines,
+            'mean_line': self.line_chars / self.lines if self.lines else 0.0,
+            'longest_line': self.longest_line,
+            'unique_terms': len(self.terms),
+            # Ties by term, so the order does not depend on which chunk finished first
+            'top_terms': heapq.nsmallest(top_n, self.terms.items(), key=lambda item: (-item[1], item[0])),
+        }
+
+
+def analyze_chunk(data):
+    """TextStats for a bytes chunk of whole lines (runs in pool workers)."""
+    stats = TextStats()
+    text = data.decode('utf-8', errors='replace')
+    lines = text.splitlines()
+    stats.bytes = len(data)
+    stats.chars = len(text)
+    words = Counter(text.split())
+    stats.words = sum(words.values())
+    stats.lines = len(lines)
+    stats.blank_lines = sum(1 for line in lines if not line.strip())
+    stats.line_chars = sum(map(len, lines))
+    stats.longest_line = max(map(len, lines), default=0)
+    # Words repeat far more than they vary, so find terms once per distinct word
+    terms = stats.terms
+    for word, count in words.items():
+        for term in TERM_PATTERN.findall(word.lower()):
+            terms[term] += count
+    return stats
+
+
+def iter_chunks(fh, chunk_bytes=CHUNK_BYTES):
+    """Blocks of a binary file object, each ending at a line break (except perhaps the last)."""
+    while True:
+        block = fh.read(chunk_bytes)
+        if not block:
+            return
+        if not block.endswith(b'\n'):
+            block += fh.readline()
+        yield block
+
+
+def analyze_text(fh, workers=None, top_n=TOP_TERMS, chunk_bytes=CHUNK_BYTES, progress=None):
+    """Summary statistics for a binary file object, using a process pool for large inputs.
+
+    progress, if given, is called with the fraction of bytes processed.
+    """
+    fh.seek(0, os.SEEK_END)
+    size = fh.tell()
+    fh.seek(0)
+    workers = workers or os.cpu_count() or 1
+    total = TextStats()
+
+    def done(stats):
+        total.merge(stats)
+        if progress and size:
+            progress(total.bytes / size)
+
+    if workers < 2 or size < MIN_PARALLEL_BYTES:
+        for chunk in iter_chunks(fh, chunk_bytes):
+            done(analyze_chunk(chunk))
+        return total.summary(top_n)
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in iter_chunks(fh, chunk_bytes):
+            # Bound the chunks in flight so memory does not grow with the file
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done(future.result())
+            pending.add(pool.submit(analyze_chunk, chunk))
+        for future in pending:
+            done(future.result())
+    return total.summary(top_n)
+
+
+def analyze_bytes(data, top_n=TOP_TERMS, progress=None):
+    """analyze_text for in-memory data in this process alone, e.g. inside a shared pool worker."""
+    return analyze_text(io.BytesIO(data), workers=1, top_n=top_n, progress=progress)
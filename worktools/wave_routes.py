@@ -0,0 +1,370 @@
+"""Wave route parsing and path building for ZDAF fiber route dumps."""
+import hashlib
+import re
+
+from worktools.instrumentation import stage
+from worktools.jobs import track_progress
+
+def parse_facility_id(line):
+    """Parse a network facility ID into its components."""
+    match = re.search(r'(\d+)\s+(/FIBER\w+/[A-Z0-9]+/[A-Z0-9]+)', line)
+    if not match:
+        return None
+
+    seq_num, facility = match.groups()
+    parts = facility.split('/')
+    if len(parts) != 4:
+        return None
+
+    _, fiber_type, loc1, loc2 = parts
+    loc1_code = loc1[:8]
+    loc1_suffix = loc1[8:]
+    loc2_code = loc2[:8]
+    loc2_suffix = loc2[8:]
+
+    return {
+        'seq_num': seq_num,
+        'full_facility': facility,
+        'fiber_type': fiber_type,
+        'loc1': {
+            'code': loc1_code,
+            'suffix': loc1_suffix,
+            'full': loc1
+        },
+        'loc2': {
+            'code': loc2_code,
+            'suffix': loc2_suffix,
+            'full': loc2
+        }
+    }
+
+def detect_system_change(prev_segment, curr_segment):
+    if not prev_segment or not curr_segment:
+        return False
+    for loc in ['loc1', 'loc2']:
+        prev_loc = prev_segment[loc]
+        curr_loc = curr_segment[loc]
+        if prev_loc['code'] == curr_loc['code'] and prev_loc['suffix'] != curr_loc['suffix']:
+            return True
+    return False
+
+def remove_duplicates(routes):
+    seen = set()
+    unique_routes = []
+    for route in routes:
+        route_key = f"{route['seq_num']} {route['full_facility']}"
+        if route_key not in seen:
+            seen.add(route_key)
+            unique_routes.append(route)
+    return unique_routes
+
+class Facility:
+    """One fiber facility of a wave route, e.g. "12 /FIBERL/DLLSTXABA01/FTWOTXCDA02".
+
+    Parsed once and passed as is from parsing to path building. Numbers,
+    locations and fiber types repeat across a wave, so parsers share one
+    string object per distinct value between records (see iter_wave_routes).
+    """
+    __slots__ = ('number', 'fiber_type', 'loc1', 'loc2')
+
+    def __init__(self, number, fiber_type, loc1, loc2):
+        self.number = number
+        self.fiber_type = fiber_type
+        self.loc1 = loc1
+        self.loc2 = loc2
+
+    @classmethod
+    def from_route(cls, route):
+        """Build a record from a "{number} {facility}" route string, or return None."""
+        parts = route.split()
+        if len(parts) < 2:
+            return None
+        path_parts = parts[1].split('/')
+        if len(path_parts) != 4:
+            return None
+        _, fiber_type, loc1, loc2 = path_parts
+        return cls(parts[0], fiber_type, loc1, loc2)
+
+    @property
+    def clli1(self):
+        return self.loc1[:8]
+
+    @property
+    def clli2(self):
+        return self.loc2[:8]
+
+    # The first character after the CLLI identifies the system
+    @property
+    def suffix1(self):
+        return self.loc1[8:9]
+
+    @property
+    def suffix2(self):
+        return self.loc2[8:9]
+
+    @property
+    def facility(self):
+        return f"/{self.fiber_type}/{self.loc1}/{self.loc2}"
+
+    @property
+    def line(self):
+        return f"{self.number} {self.facility}"
+
+    def _key(self):
+        return (self.number, self.fiber_type, self.loc1, self.loc2)
+
+    def __eq__(self, other):
+        if not isinstance(other, Facility):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash((self.number, self.fiber_type, self.loc1, self.loc2))
+
+    def __reduce__(self):
+        # Pickle memoizes the shared strings, so sharing survives the trip from worker processes
+        return (Facility, self._key())
+
+    def __str__(self):
+        return self.line
+
+    def __repr__(self):
+        return f"Facility({self.line!r})"
+
+def wave_line_fields(line):
+    """Return (number, fiber_type, loc1, loc2) for a ZDAF fiber line, or None."""
+    parts = line.split()
+    if len(parts) > 2:
+        facility = next((p for p in parts if p.startswith('/')), None)
+        if facility is None:
+            return None
+        if '/FIBER' in facility.upper() and not line.endswith('null null'):
+            try:
+                number = parts[1]
+                path_parts = facility.split('/')
+                if len(path_parts) == 4:
+                    _, fiber_type, loc1, loc2 = path_parts
+                    return (number, fiber_type, loc1, loc2)
+            except:
+                return None
+    return None
+
+def make_facility(fields, shared):
+    """Build a Facility whose strings are the single copies kept in shared."""
+    number, fiber_type, loc1, loc2 = fields
+    return Facility(shared.setdefault(number, number), shared.setdefault(fiber_type, fiber_type),
+                    shared.setdefault(loc1, loc1), shared.setdefault(loc2, loc2))
+
+def parse_wave_line(line, shared=None):
+    """Return the Facility for a ZDAF fiber line, or None."""
+    fields = wave_line_fields(line)
+    if fields is None:
+        return None
+    return make_facility(fields, {} if shared is None else shared)
+
+def iter_wave_routes(lines):
+    """Yield unique fiber Facility records from ZDAF lines as they are read."""
+    seen = set()
+    shared = {}
+    for line in lines:
+        fields = wave_line_fields(line.rstrip('\r\n'))
+        if fields is not None and fields not in seen:
+            seen.add(fields)
+            yield make_facility(fields, shared)
+
+def parse_wave_routes(input_data, progress=None):
+    with stage("wave.parse_routes"):
+        return list(iter_wave_routes(track_progress(input_data.splitlines(), progress)))
+
+def routes_digest(routes):
+    """SHA-256 of parsed routes (records or route strings), for caching path results."""
+    digest = hashlib.sha256()
+    for route in routes:
+        digest.update(str(route).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+def unique_facilities(routes):
+    """Facility records for routes (records or route strings), in order and without duplicates.
+
+    Also returns how many distinct routes there were, including unparseable strings.
+    """
+    facilities = []
+    seen = set()
+    for route in routes:
+        facility = route if isinstance(route, Facility) else Facility.from_route(route)
+        key = route if facility is None else facility
+        if key not in seen:
+            seen.add(key)
+            if facility is not None:
+                facilities.append(facility)
+    return facilities, len(seen)
+
+def index_departures(facilities):
+    """Both directions of every facility, in input order, keyed by the CLLI they leave from.
+
+    A departure is position * 2, plus 1 when the facility is walked from loc2 to loc1.
+    """
+    departures = {}
+    for position, facility in enumerate(facilities):
+        departures.setdefault(facility.clli1, []).append(position * 2)
+        departures.setdefault(facility.clli2, []).append(position * 2 + 1)
+    return departures
+
+def build_wave_path(output1, start_loc, progress=None):
+    """Walk the routes from start_loc, always taking the first unused route that continues the path.
+
+    output1 holds Facility records (route strings are accepted too). Returns
+    the path lines with "--- SYSTEM CHANGE ---" markers, the routes and a summary.
+    """
+    with stage("wave.index_routes"):
+        facilities, original_routes_count = unique_facilities(output1)
+        departures = index_departures(facilities)
+
+    used = bytearray(len(facilities))
+    # Per-CLLI cursor past departures whose facility is already used
+    cursors = dict.fromkeys(departures, 0)
+
+    def next_departure(clli):
+        options = departures.get(clli)
+        if options is None:
+            return None
+        cursor = cursors[clli]
+        while cursor < len(options) and used[options[cursor] >> 1]:
+            cursor += 1
+        cursors[clli] = cursor
+        return options[cursor] if cursor < len(options) else None
+
+    final_routes = []
+    system_changes = 0
+
+    start_loc = start_loc.strip().upper()[:8]
+    departure = next_departure(start_loc)
+    if departure is None:
+        return ["Error: Could not find starting location in parsed routes."], [], f"Original Routes: {original_routes_count} | Final Routes: 0 | System Changes: 0"
+
+    with stage("wave.walk_path"):
+        prev_suffix = None
+        walked = 0
+        while departure is not None:
+            position, forward = departure >> 1, not departure & 1
+            facility = facilities[position]
+            curr_suffix = facility.suffix1 if forward else facility.suffix2
+            if prev_suffix and curr_suffix and prev_suffix != curr_suffix:
+                final_routes.append('--- SYSTEM CHANGE ---')
+                system_changes += 1
+            final_routes.append(facility.line)
+            used[position] = 1
+            walked += 1
+            if progress and walked % 100 == 0:
+                progress(walked / original_routes_count)
+            # The starting route is compared by the side it leaves from
+            prev_suffix = curr_suffix if walked == 1 else (facility.suffix2 if forward else facility.suffix1)
+            departure = next_departure(facility.clli2 if forward else facility.clli1)
+
+    summary = f"Original Routes: {original_routes_count} | Final Routes: {walked} | System Changes: {system_changes}"
+    output3 = list(output1)
+    return final_routes, output3, summary
+
+def build_full_coverage_path(output1, start_loc, progress=None):
+    """Walk every route connected to start_loc, breaking the path as rarely as possible.
+
+    CLLIs are the nodes of a multigraph with one edge per facility, and the
+    path is an Eulerian trail from start_loc found with Hierholzer's
+    algorithm in linear time. When the odd-degree CLLIs rule out a single
+    trail, they are paired with virtual edges; each one becomes a
+    "--- GAP ---" marker where the path has to jump. Returns the path lines,
+    the Facility records not connected to start_loc at all, and a summary.
+    """
+    with stage("wave.index_routes"):
+        facilities, original_routes_count = unique_facilities(output1)
+        departures = index_departures(facilities)
+
+    start_loc = start_loc.strip().upper()[:8]
+    if start_loc not in departures:
+        return ["Error: Could not find starting location in parsed routes."], [], f"Original Routes: {original_routes_count} | Final Routes: 0 | System Changes: 0"
+
+    count = len(facilities)
+    # The CLLI each departure arrives at; virtual gap edges are appended after the facilities
+    arrivals = []
+    for facility in facilities:
+        arrivals.append(facility.clli2)
+        arrivals.append(facility.clli1)
+
+    with stage("wave.connect_routes"):
+        reached = {start_loc}
+        order = [start_loc]
+        for clli in order:
+            for departure in departures[clli]:
+                other = arrivals[departure]
+                if other not in reached:
+                    reached.add(other)
+                    order.append(other)
+        unconnected = [facility for facility in facilities if facility.clli1 not in reached]
+
+        # A trail may only end at odd-degree CLLIs: keep the start and one other, pair up the rest
+        odd = [clli for clli in order if len(departures[clli]) % 2 and clli != start_loc]
+        if len(departures[start_loc]) % 2:
+            odd.pop()
+        for clli1, clli2 in zip(odd[::2], odd[1::2]):
+            departures[clli1].append(len(arrivals))
+            departures[clli2].append(len(arrivals) + 1)
+            arrivals.append(clli2)
+            arrivals.append(clli1)
+
+    with stage("wave.walk_path"):
+        used = bytearray(len(arrivals) // 2)
+        cursors = dict.fromkeys(order, 0)
+        walked = 0
+        trail = []
+        stack = [(start_loc, -1)]
+        while stack:
+            clli, arrived_by = stack[-1]
+            options = departures[clli]
+            cursor = cursors[clli]
+            while cursor < len(options) and used[options[cursor] >> 1]:
+                cursor += 1
+            cursors[clli] = cursor
+            if cursor < len(options):
+                departure = options[cursor]
+                used[departure >> 1] = 1
+                stack.append((arrivals[departure], departure))
+                walked += 1
+                if progress and walked % 1000 == 0:
+                    progress(walked / len(used))
+            else:
+                stack.pop()
+                if arrived_by >= 0:
+                    trail.append(arrived_by)
+        trail.reverse()
+
+    final_routes = []
+    final_routes_count = 0
+    system_changes = 0
+    gaps = 0
+    gap_pending = False
+    prev_suffix = None
+    for departure in trail:
+        position, forward = departure >> 1, not departure & 1
+        if position >= count:
+            gap_pending = True
+            continue
+        facility = facilities[position]
+        curr_suffix = facility.suffix1 if forward else facility.suffix2
+        # The first route of each stretch is compared by the side it leaves from
+        first = not final_routes or gap_pending
+        if gap_pending and final_routes:
+            final_routes.append('--- GAP ---')
+            gaps += 1
+            prev_suffix = None
+        gap_pending = False
+        if prev_suffix and curr_suffix and prev_suffix != curr_suffix:
+            final_routes.append('--- SYSTEM CHANGE ---')
+            system_changes += 1
+        final_routes.append(facility.line)
+        final_routes_count += 1
+        prev_suffix = curr_suffix if first else (facility.suffix2 if forward else facility.suffix1)
+
+    summary = (f"Original Routes: {original_routes_count} | Final Routes: {final_routes_count} | "
+               f"System Changes: {system_changes} | Gaps: {gaps} | Unconnected: {len(unconnected)}")
+    return final_routes, unconnected, summary
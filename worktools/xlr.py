@@ -0,0 +1,171 @@
+"""XLR text parsing: key fields, CLLI street addresses and network facilities."""
+import re
+from functools import lru_cache
+
+from worktools.instrumentation import stage
+
+XLR_FIELDS = [
+    "Service Name", "Circuit ID", "Account Name",
+    "Product Group", "Product", "Product Category", "Rate Code",
+    "A-Clli", "A-Address", "Z-Clli", "Z-Address"
+]
+
+# "{number} /{type} /{loc1}/{loc2}", where type is a rate such as 100G or FIBER
+FACILITY_PATTERN = re.compile(
+    r'([A-Z0-9]+)?\s*/([0-9A-Z]+(?:G|FIBER))\s*/([A-Z0-9]+)/([A-Z0-9]+)', re.IGNORECASE)
+
+@lru_cache(maxsize=64)
+def field_scanner(field_names, line_start=False):
+    """One compiled pattern that finds any of field_names, with its value, in a single pass.
+
+    field_names is a tuple (so scanners can be cached per field set). The
+    names form one alternation, longest first so "Product Group" is not
+    read as "Product"; the matched name is in the "field" group and the
+    rest of its line, after an optional ':' or '=', in the "value" group.
+    With line_start, names only match at the start of a line.
+    """
+    names = sorted(set(field_names), key=len, reverse=True)
+    alternation = "|".join(re.escape(name) for name in names)
+    anchor = r"^[ \t]*" if line_start else ""
+    return re.compile(
+        rf"{anchor}(?P<field>{alternation})(?!\w)[ \t]*[:=]?[ \t]*(?P<value>[^\r\n]*)",
+        re.IGNORECASE | re.MULTILINE,
+    )
+
+def scan_fields(data, field_names, line_start=False):
+    """Map each of field_names to the value of its first occurrence in data.
+
+    As with a per-field re.search, only the first occurrence of a name
+    counts: when its value is empty or "-" the field is left out rather
+    than read from a later occurrence.
+    """
+    canonical = {name.lower(): name for name in field_names}
+    seen = set()
+    found = {}
+    for m in field_scanner(tuple(field_names), line_start).finditer(data):
+        field = canonical[m.group('field').lower()]
+        if field not in seen:
+            seen.add(field)
+            value = m.group('value').strip()
+            if value and value != "-":
+                found[field] = value
+            if len(seen) == len(canonical):
+                break
+    return found
+
+def xlr_facility_matches(xlr_text):
+    """Yield a FACILITY_PATTERN match for every network facility line of an XLR."""
+    for line in xlr_text.splitlines():
+        m = FACILITY_PATTERN.search(line)
+        if m:
+            yield m
+
+def format_facility(m):
+    return f"{m.group(1) or ''} /{m.group(2)} /{m.group(3)}/{m.group(4)}".strip()
+
+def parse_xlr_record(xlr_text, progress=None):
+    """Extract the key fields, CLLI addresses and network facilities from an XLR."""
+    fields_to_extract = XLR_FIELDS
+    with stage("xlr.key_fields"):
+        extracted = {field: "Not found" for field in fields_to_extract}
+        tab_lines = False
+        for line in xlr_text.splitlines():
+            for field in fields_to_extract:
+                if line.startswith(field + "\t"):
+                    tab_lines = True
+                    parts = line.split('\t', 1)
+                    if len(parts) > 1:
+                        extracted[field] = parts[1].strip()
+        # Records written as "Field: value" lines instead of XLR tab lines
+        if not tab_lines:
+            extracted.update(scan_fields(xlr_text, fields_to_extract, line_start=True))
+    if progress:
+        progress(1 / 3)
+    a_clli = extracted.get("A-Clli", "").strip()
+    z_clli = extracted.get("Z-Clli", "").strip()
+
+    # Find the table header and parse the table
+    lines = xlr_text.splitlines()
+    table_start = None
+    for i, line in enumerate(lines):
+        if (
+            "CLLI" in line and "Address" in line
+            and line.count('\t') > 2
+        ):
+            table_start = i
+            break
+
+    clli_to_address = {}
+    if table_start is not None:
+        with stage("xlr.read_csv"):
+            # pandas is only needed for the CLLI table, so keep it off the cold start path
+            import pandas as pd
+            from io import StringIO
+
+            table_text = "\n".join(lines[table_start:])
+            try:
+                df = pd.read_csv(
+                    StringIO(table_text),
+                    sep='\t',
+                    dtype=str,
+                    on_bad_lines='skip',
+                    skip_blank_lines=True
+                )
+                df.columns = df.columns.str.strip()
+                if "CLLI" in df.columns and "Address" in df.columns:
+                    for clli, addr in zip(df["CLLI"], df["Address"]):
+                        if pd.notna(clli) and pd.notna(addr) and addr.strip():
+                            clli_to_address[clli.strip()] = addr.strip()
+            except Exception as e:
+                pass
+
+    def fuzzy_lookup_first(base_clli):
+        for clli, addr in clli_to_address.items():
+            if clli.startswith(base_clli):
+                return addr
+        return "Not found"
+
+    if progress:
+        progress(2 / 3)
+    address_a = fuzzy_lookup_first(a_clli) if a_clli else "Not found"
+    address_z = fuzzy_lookup_first(z_clli) if z_clli else "Not found"
+
+    # Network Facilities Extraction
+    with stage("xlr.facilities"):
+        facilities = [format_facility(m) for m in xlr_facility_matches(xlr_text)]
+
+    return {
+        'fields': extracted,
+        'a_clli': a_clli,
+        'z_clli': z_clli,
+        'address_a': address_a,
+        'address_z': address_z,
+        'facilities': facilities
+    }
+
+def format_xlr_record(record):
+    """Render a parsed XLR record as the plain-text summary shown in the app."""
+    extracted = record['fields']
+    output = []
+    output.append("=== Key Fields ===")
+    output.append(f"Service Name: {extracted['Service Name']}")
+    output.append(f"Circuit ID: {extracted['Circuit ID']}")
+    output.append(f"Account Name: {extracted['Account Name']}")
+    product_summary = f"{extracted['Rate Code']} {extracted['Product']}".replace("Standard Wavelength", "Wavelength").strip()
+    output.append(f"Product: {product_summary}")
+    output.append(f"A-Clli: {extracted['A-Clli']}")
+    output.append(f"A-Address: {extracted['A-Address']}")
+    output.append(f"Z-Clli: {extracted['Z-Clli']}")
+    output.append(f"Z-Address: {extracted['Z-Address']}")
+    output.append("")
+    output.append(f"Street Address for A-Clli ({record['a_clli']}): {record['address_a']}")
+    output.append(f"Street Address for Z-Clli ({record['z_clli']}): {record['address_z']}")
+    output.append("")
+    if record['facilities']:
+        output.append("=== Network Facilities ===")
+        output.extend(record['facilities'])
+
+    return "\n".join(output)
+
+def parse_xlr(xlr_text, progress=None):
+    return format_xlr_record(parse_xlr_record(xlr_text, progress))
@@ -0,0 +1,155 @@
+"""Streaming Excel export of tool results.
+
+A workbook is a sequence of sheets, each given as (name, columns, rows)
+where rows is any iterable of dicts (read by column name) or sequences.
+Workbooks are written with xlsxwriter in constant_memory mode, which flushes
+each row to a temporary file as soon as the next row starts, so memory
+stays flat however many rows a sheet has and rows can come from generators.
+Sheets longer than Excel's row limit continue on "Name (2)" and so on.
+
+Cells are written with the type-specific methods, never the generic
+write(): text such as "=HYPERLINK(...)" or "http://..." from an uploaded
+export stays text instead of becoming a formula or a link.
+
+xlsxwriter is optional; it is only imported when a workbook is written.
+"""
+import numbers
+import re
+
+from worktools.fiber_sheath import base_cable_name
+from worktools.xlr import XLR_FIELDS
+
+MAX_ROWS = 1_048_576
+MAX_SHEET_NAME = 31
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+KMZ_COLUMNS = ['placemark', 'entered_ft', 'entered_mi', 'calculated_ft', 'calculated_mi', 'difference_ft', 'points']
+SHEATH_COLUMNS = ['sheath', 'cable', 'footage_ft', 'min_fibers_available']
+WAVE_PATH_COLUMNS = ['position', 'seq', 'facility', 'marker']
+XLR_COLUMNS = ['field', 'value']
+
+
+def sheet_name(name, used):
+    """A valid, unused worksheet name for name; adds it to used."""
+    base = INVALID_SHEET_CHARS.sub('_', name).strip("'") or 'Sheet'
+    candidate = base[:MAX_SHEET_NAME]
+    number = 2
+    while candidate.lower() in used:
+        suffix = f" ({number})"
+        candidate = base[:MAX_SHEET_NAME - len(suffix)] + suffix
+        number += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def cell(value):
+    """Lists (such as XLR facilities) go in one cell; everything else is written as is."""
+    if isinstance(value, (list, tuple)):
+        return '; '.join(map(str, value))
+    return value
+
+
+class WorkbookWriter:
+    """Row-at-a-time writer for a constant-memory workbook; rows go to the latest sheet."""
+
+    def __init__(self, target):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(target, {'constant_memory': True, 'nan_inf_to_errors': True})
+        self.header = self.workbook.add_format({'bold': True})
+        self.used = set()
+        self.worksheet = None
+        self.written = 0
+
+    def add_sheet(self, name, columns):
+        self.name = name
+        self.columns = columns
+        self.worksheet = self.workbook.add_worksheet(sheet_name(name, self.used))
+        for col, column in enumerate(columns):
+            self.worksheet.write_string(0, col, str(column), self.header)
+        self.worksheet.freeze_panes(1, 0)
+        self.row_number = 1
+
+    def write(self, row):
+        """Write a dict (read by column name) or a sequence of values."""
+        if self.row_number == MAX_ROWS:
+            self.add_sheet(self.name, self.columns)
+        values = [row.get(column) for column in self.columns] if isinstance(row, dict) else row
+        for col, value in enumerate(values):
+            # None leaves the cell empty
+            if value is not None:
+                self.write_cell(col, cell(value))
+        self.row_number += 1
+        self.written += 1
+
+    def write_cell(self, col, value):
+        if isinstance(value, bool):
+            self.worksheet.write_boolean(self.row_number, col, value)
+        elif isinstance(value, numbers.Real):
+            # NaN and infinity become #NUM! and #DIV/0! (nan_inf_to_errors)
+            self.worksheet.write_number(self.row_number, col, value)
+        else:
+            self.worksheet.write_string(self.row_number, col, str(value))
+
+    def close(self):
+        self.workbook.close()
+
+
+def write_workbook(target, sheets):
+    """Write (name, columns, rows) sheets to target, a path or a binary file object.
+
+    Returns the number of data rows written.
+    """
+    writer = WorkbookWriter(target)
+    try:
+        for name, columns, rows in sheets:
+            writer.add_sheet(name, columns)
+            for row in rows:
+                writer.write(row)
+    finally:
+        writer.close()
+    return writer.written
+
+
+def kmz_sheet(rows, name="KMZ Comparison"):
+    """Sheet for process_kml comparison rows."""
+    return name, KMZ_COLUMNS, rows
+
+
+def sheath_sheet(result, name="Sheath Footage"):
+    """Sheet for a parse_fiber_sheaths result: footage and lowest fiber availability per sheath."""
+    def rows():
+        lowest = {}
+        for sheath, avail in result['sheath_fiber_avail']:
+            lowest[sheath] = min(avail, lowest.get(sheath, avail))
+        for sheath in result['unique_sheaths']:
+            yield {'sheath': sheath, 'cable': base_cable_name(sheath),
+                   'footage_ft': result['sheath_footage'][sheath],
+                   'min_fibers_available': lowest.get(sheath)}
+    return name, SHEATH_COLUMNS, rows()
+
+
+def wave_path_sheet(path, name="Wave Path"):
+    """Sheet for a build_wave_path path: one row per facility, markers on rows of their own."""
+    def rows():
+        position = 0
+        for line in path:
+            if line.startswith(('---', 'Error:')):
+                yield {'marker': line.strip('- ')}
+                continue
+            position += 1
+            seq, _, facility = line.partition(' ')
+            yield {'position': position, 'seq': seq, 'facility': facility}
+    return name, WAVE_PATH_COLUMNS, rows()
+
+
+def xlr_sheet(record, name="XLR Key Fields"):
+    """Sheet for a parse_xlr_record result: key fields, street addresses, then facilities."""
+    def rows():
+        for field in XLR_FIELDS:
+            yield (field, record['fields'][field])
+        yield ('A Street Address', record['address_a'])
+        yield ('Z Street Address', record['address_z'])
+        for facility in record['facilities']:
+            yield ('Facility', facility)
+    return name, XLR_COLUMNS, rows()